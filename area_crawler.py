@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+# Crawls a mountain project area for the links of every route in it.
+# Used by gpsgrabber.py, but can be run on its own:
+#
+#   python3 area_crawler.py crawl <area url>
+#   python3 area_crawler.py crawl <area url> --save saved_pages/
+#   python3 area_crawler.py serve saved_pages/ 8000
+#
+# Pages are fetched by a pool of threads sharing one keep-alive session, but
+# politely: there's a limit on requests per second (for everything) and on
+# simultaneous requests to one host, and failed requests are retried with
+# an increasing wait. Areas are visited breadth first.
+#
+# "serve" stands in for mountain project using pages saved with --save, so
+# the crawler can be tried out (or debugged) without sending any traffic.
+#
+# With a ResponseCache (crawl_cache.py) pages fetched recently aren't
+# requested again, and with a CrawlCheckpoint an interrupted crawl resumes
+# instead of starting over.
+#
+# The same crawler (same limits, same session) also gets the route details
+# from the api, see Crawler.route_details.
+
+from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit
+import os
+import re
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+import requests
+
+MP_HOST = "https://www.mountainproject.com"
+MP_ROUTES_API = MP_HOST + "/data/get-routes"
+
+
+
+# RateLimiter spaces requests out to at most `rate` per second across all
+# threads. Each caller reserves the next free slot, then sleeps until it
+class RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+
+# parse_area returns the sub area links of an area page, or (for the lowest
+# pages, the walls) the route links. Blank sub areas give empty lists
+def parse_area(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    lef_navs = soup.find_all('div', class_='lef-nav-row')
+    if lef_navs:
+        return [link['href'] for lef_nav in lef_navs for link in lef_nav.findChildren('a')], []
+    routes = soup.find('table', id='left-nav-route-table')
+    if routes is None:
+        return [], []
+    return [], [route['href'] for route in routes.findChildren('a')]
+
+
+
+class Crawler:
+    # rate:         requests per second, in total
+    # max_per_host: requests in flight at once to any one host
+    # workers:      threads fetching pages
+    # retries:      extra attempts for a failed request, waiting backoff,
+    #               2*backoff, 4*backoff... seconds in between
+    # save_dir:     also write every page fetched here (for "serve")
+    # cache:        a crawl_cache.ResponseCache to reuse/revalidate pages with
+    def __init__(self, rate=2.0, max_per_host=4, workers=8, retries=3,
+                 backoff=1.0, save_dir=None, session=None, cache=None):
+        self.limiter = RateLimiter(rate)
+        self.max_per_host = max_per_host
+        self.host_slots = {}
+        self.host_lock = threading.Lock()
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.save_dir = save_dir
+        self.cache = cache
+        self.requests_sent = 0
+        self.session = session or requests.Session()
+        # one connection pool big enough for all the workers, reused between requests
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self.host_lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self.host_slots[host]
+
+    # fetch returns the response for url, retrying connection errors, 429s and 5xxs
+    def fetch(self, url, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            self.requests_sent += 1
+            try:
+                with self._host_slot(url):
+                    response = self.session.get(url, timeout=30, **kwargs)
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f'{response.status_code} for {url}', response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        raise error
+
+    def _save(self, url, html):
+        path = os.path.join(self.save_dir, urlsplit(url).path.strip('/') + '.html')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(html)
+
+    # get_text returns the page at url, from the cache when it can
+    def get_text(self, url):
+        if self.cache is None:
+            return self.fetch(url).text
+        entry = self.cache.lookup(url)
+        if entry and self.cache.is_fresh(entry):
+            return entry['body']
+        response = self.fetch(url, headers=self.cache.validators(entry))
+        if response.status_code == 304 and entry:
+            self.cache.touch(url, entry)
+            return entry['body']
+        self.cache.store(url, response)
+        return response.text
+
+    def _visit(self, url):
+        html = self.get_text(url)
+        if self.save_dir:
+            self._save(url, html)
+        return parse_area(html)
+
+    # iter_route_links yields the links of every route in the area at url as
+    # soon as their wall is fetched. Sub areas are queued as they're found and
+    # handed out oldest first (breadth first), keeping every worker busy
+    # instead of waiting for a whole level to finish
+    # checkpoint: a crawl_cache.CrawlCheckpoint, saved every checkpoint_every
+    #             pages and removed once the crawl finishes. When resuming, the
+    #             links found before the crawl stopped come out first
+    def iter_route_links(self, url, checkpoint=None, checkpoint_every=20):
+        frontier = deque([url])
+        seen = {url}
+        new_seen = [url]  # since the last checkpoint
+        state = checkpoint.load(url) if checkpoint else None
+        if state:
+            frontier = deque(state['pending'])
+            seen = set(state['seen'])
+            new_seen = []
+            print(f"resuming crawl: {len(seen) - len(frontier)} areas done, {len(frontier)} to go")
+            yield from checkpoint.route_links()
+        elif checkpoint:
+            checkpoint.remove()  # left over from some other area
+        new_done, new_links = [], []  # also since the last checkpoint
+        with ThreadPoolExecutor(self.workers) as pool:
+            running = {}
+            while frontier or running:
+                while frontier and len(running) < self.workers:
+                    next_url = frontier.popleft()
+                    running[pool.submit(self._visit, next_url)] = next_url
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    area_url = running.pop(future)
+                    sublinks, routes = future.result()
+                    print(f"{area_url}: {len(sublinks)} sub areas, {len(routes)} routes")
+                    for sublink in sublinks:
+                        if sublink not in seen:
+                            seen.add(sublink)
+                            frontier.append(sublink)
+                            if checkpoint:
+                                new_seen.append(sublink)
+                    if checkpoint:
+                        new_done.append(area_url)
+                        new_links.extend(routes)
+                    yield from routes
+                if checkpoint and len(new_done) >= checkpoint_every:
+                    checkpoint.save(url, new_seen, new_done, new_links)
+                    new_seen, new_done, new_links = [], [], []
+        if checkpoint:
+            checkpoint.remove()
+
+    # crawl returns all the route links at once (see iter_route_links)
+    def crawl(self, url, checkpoint=None, checkpoint_every=20):
+        return list(self.iter_route_links(url, checkpoint, checkpoint_every))
+
+    # route_details asks the api about route_ids (any iterable, eg. straight
+    # from iter_route_ids while the crawl is still going). Repeated ids are
+    # dropped, the rest go out batch_size (100 at most) at a time with up to
+    # `workers` batches in flight. Each batch is parsed into its own block of
+    # column arrays, the blocks are joined once at the end.
+    # Returns a DataFrame (index: route id) with route, location, longitude
+    # and latitude, routes the api didn't know about are left out
+    def route_details(self, route_ids, api_key, batch_size=100, api_url=MP_ROUTES_API):
+        text_columns = ('name', 'type', 'rating', 'pitches', 'location')
+
+        def fetch_batch(batch):
+            row = {route_id: i for i, route_id in enumerate(batch)}
+            block = {c: np.empty(len(batch), dtype=object) for c in text_columns}
+            block['longitude'] = np.full(len(batch), np.nan)
+            block['latitude'] = np.full(len(batch), np.nan)
+            response = self.fetch(api_url, params={'routeIds': ','.join(batch), 'key': api_key})
+            for route in response.json()['routes']:
+                i = row.get(str(route['id']))
+                if i is None:
+                    continue
+                for c in ('name', 'type', 'rating', 'pitches'):
+                    block[c][i] = route.get(c)
+                block['location'][i] = '-'.join(route['location'])
+                block['longitude'][i] = route['longitude']
+                block['latitude'][i] = route['latitude']
+            print(f"route details: {len(batch)} routes")
+            return batch, block
+
+        blocks = []
+        with ThreadPoolExecutor(self.workers) as pool:
+            running = set()
+            for batch in group_routes(unique(str(route_id) for route_id in route_ids), batch_size):
+                if len(running) >= self.workers:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    blocks.extend(future.result() for future in done)
+                running.add(pool.submit(fetch_batch, batch))
+            blocks.extend(future.result() for future in running)
+
+        ids = [route_id for batch, _ in blocks for route_id in batch]
+        columns = {c: np.concatenate([block[c] for _, block in blocks]) if blocks else []
+                   for c in text_columns + ('longitude', 'latitude')}
+        df = pd.DataFrame(columns, index=pd.Index(ids, name='id'))
+        df = df[df.location.notna()]
+        df['route'] = df.name.astype(str)+'-'+df.type.astype(str)+\
+        '-'+df.rating.astype(str)+'-'+df.pitches.astype(str)+'p'
+        return df[['route', 'location', 'longitude', 'latitude']]
+
+
+
+# iter_route_ids yields the id of each route link (the first number in its
+# path), skipping ids it has already seen
+def iter_route_ids(route_links):
+    return unique(re.search(r'\d+', urlsplit(link).path).group() for link in route_links)
+
+
+
+# unique yields the items of iterable in order, leaving out repeats
+def unique(iterable):
+    seen = set()
+    for item in iterable:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+
+
+# group_routes clusters route ids in groups of n (as they arrive)
+# mountain project API only allows groups of 100 or fewer
+def group_routes(route_ids, n=100):
+    group = []
+    for route_id in route_ids:
+        group.append(route_id)
+        if len(group) == n:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+
+# SnapshotHandler serves pages saved by Crawler(save_dir=...) in place of
+# mountain project. Links in the pages are pointed back at this server
+class SnapshotHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        path = os.path.join(self.directory, urlsplit(self.path).path.strip('/') + '.html')
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path) as f:
+            html = f.read()
+        local = f"http://{self.headers['Host']}"
+        body = html.replace(MP_HOST, local).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+
+# serve_snapshot starts the stand-in server (in a background thread) and
+# returns it, its url is f"http://localhost:{server.server_port}"
+def serve_snapshot(directory, port=0):
+    handler = lambda *args, **kwargs: SnapshotHandler(*args, directory=directory, **kwargs)
+    server = ThreadingHTTPServer(('localhost', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == 'crawl':
+        save_dir = sys.argv[4] if len(sys.argv) > 4 and sys.argv[3] == '--save' else None
+        links = Crawler(save_dir=save_dir).crawl(sys.argv[2])
+        print('\n'.join(links))
+        print(len(links), "routes in total")
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'serve':
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8000
+        server = serve_snapshot(sys.argv[2], port)
+        print(f"serving {sys.argv[2]} at http://localhost:{server.server_port}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        print("usage: area_crawler.py crawl <area url> [--save <dir>]")
+        print("       area_crawler.py serve <dir> [port]")
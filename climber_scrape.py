@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+
+# Bulk scrape of mountain project climbers for csv_scraping.ipynb: seed
+# names -> users -> tick exports -> one row of stats per climber.
+#
+#   python3 climber_scrape.py names.txt climber_data7
+#
+# (names.txt has one seed name per line)
+#
+# Downloading and number crunching are separate stages so neither waits on
+# the other:
+#   - threads (sharing one rate limited area_crawler.Crawler) look up users
+#     and download their tick exports into memory
+#   - downloads wait in a bounded queue, if the stats fall behind the
+#     downloads pause instead of piling up
+#   - worker processes turn batches of exports into stats, away from the GIL
+# Nothing is written to disk but the stats (no more wget/rm), and with a
+# StatsSink those are saved batch by batch, so a long scrape can crash and resume.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+import glob
+import io
+import os
+import queue
+import sys
+import threading
+from urllib.parse import urljoin
+import numpy as np
+import pandas as pd
+import requests
+from area_crawler import Crawler, MP_HOST, unique
+from climbing_project_api.assets.tick_loader import read_ticks
+from climbing_project_api.assets.grades import rope_values, boulder_values
+
+SEARCH_URL = MP_HOST + "/ajax/public/search/results/category"
+USER_URL = MP_HOST + "/user/{}"
+
+# add danger column
+danger_rating = {'PG13':1 ,'R':2,'X':3}
+
+
+
+# find_user_ids returns the ids of the users mountain project finds for name
+def find_user_ids(crawler, name):
+    resp = crawler.fetch(SEARCH_URL, params={'q': name, 'c': 'Users', 'o': 0, 's': 'Default'})
+    users = resp.json()['results']['Users']
+    return [u[12:21] for u in users]
+
+
+
+# get_csv_url: the profile url redirects to one with the user name in it
+def get_csv_url(crawler, user_id):
+    url = USER_URL.format(user_id)
+    location = crawler.fetch(url, allow_redirects=False).headers['Location']
+    return urljoin(url, location.rstrip('/') + '/tick-export')
+
+
+
+# get_danger: 1, 2 or 3 for PG13, R and X ratings ('5.10a R'), otherwise 0
+def get_danger(ratings):
+    danger = ratings.astype(str).str.split().str[1].map(danger_rating)
+    return danger.fillna(0).astype(int)
+
+
+
+# scrape_grades turns ratings into numbers on the scale of climber_data1-6
+# (the one csv_scraping.ipynb always used): the bundled tables
+# (climbing_project_api/assets/grades.py) except 5.7+, 5.8 and 5.9 are 7.5,
+# 8.5 and 9.5, everything up to V0-1 is 0 and the rest of the V grades are
+# rounded to 0.1 (V1 is 1.2, not 1.25). Mixed ratings ('5.8 V0') count
+# as boulders only on routes of type 'Boulder', anything not on the tables
+# (ice, aid...) is NaN
+def scrape_grades(ratings, route_types):
+    ratings = ratings.astype(str)
+    yds = ratings.str.extract(r'^\s*(5\S*)', expand=False)
+    vgrade = ratings.str.extract(r'(?:^|\s)(V\S*)', expand=False)
+    boulder = (vgrade.notna() & ((route_types == 'Boulder') | yds.isna())).to_numpy()
+    rope = rope_values(yds)
+    rope = np.round(np.where(np.isin(rope, [7.4, 8.4, 9.4]), rope + .1, rope), 1)
+    hueco = boulder_values(vgrade)
+    hueco = np.where(hueco < 1, 0, np.round(hueco, 1))
+    return np.where(boulder, hueco, rope)
+
+
+
+# create user ticks
+# file: path, url or file object of a tick export
+def create_user_ticks(file):
+    cols = ['Date','Rating','Pitches','Style','Lead Style','Route Type','Location']
+    ticks = read_ticks(file, columns=cols) # only reads these columns, dates already parsed
+    ticks = ticks[cols]
+
+    #rename cols
+    old_names = ticks.columns.to_list()
+    new_names = ['date','grade','pitches','style','lead_style','type','location']
+    rename_cols = dict(zip(old_names,new_names))
+    ticks = ticks.rename(columns=rename_cols)
+
+    # add danger column
+    ticks['danger'] = get_danger(ticks.grade)
+
+    ticks['grade'] = scrape_grades(ticks.grade, ticks.type)
+    return ticks
+
+
+
+# climber_stats works out every climber's stats at once
+# ticks: tick tables (from create_user_ticks) of many climbers stacked up,
+#        with a user_id column saying whose tick each row is
+# returns one row per climber (indexed by user id). Every column comes out of
+# the same groupby, so it costs about the same for 10 climbers or 10,000
+def climber_stats(ticks):
+    route_type = ticks.type.astype('category')
+    codes = route_type.cat.codes.to_numpy()
+    contains = lambda word: np.append(route_type.cat.categories.str.contains(word), False)[codes] # code -1 (no type) -> False
+    boulder = (route_type == 'Boulder').to_numpy()
+    solo = (ticks['style'] == 'Solo').to_numpy()
+    grade = ticks.grade.to_numpy(dtype=float)
+
+    # hardest grade in each quarter of a climber's tick list (in the order of
+    # the export), a tick at position p of n is in quarter q when
+    # floor(q*n/4) <= p < floor((q+1)*n/4)
+    position = ticks.groupby('user_id', sort=False).cumcount().to_numpy()
+    n = ticks.groupby('user_id', sort=False).user_id.transform('size').to_numpy()
+    quarter = sum((k * n) // 4 <= position for k in range(1, 4))
+
+    columns = pd.DataFrame({
+        'user_id': ticks.user_id.to_numpy(),
+        'date': ticks.date.to_numpy(),
+        'pitches': ticks.pitches.to_numpy(),
+        'route_grade': np.where(boulder, np.nan, grade),
+        'boulder_grade': np.where(boulder, grade, np.nan),
+        'danger': ticks.danger.to_numpy(),
+        'solo': solo,
+        'solo_grade': np.where(solo, grade, np.nan),
+        'trad': contains('Trad'),
+        'sport': contains('Sport'),
+        'location': ticks.location.to_numpy(),
+        'onsight': (ticks.lead_style == 'Onsight').to_numpy(),
+        })
+    for q in range(4):
+        columns['quarter_max'+str(q+1)] = np.where(quarter == q, grade, np.nan)
+
+    stats = columns.groupby('user_id', sort=False).agg(
+        first_date = ('date', 'min'),
+        last_date = ('date', 'max'),
+        climbs_total = ('date', 'size'),
+        pitches_total = ('pitches', 'sum'),
+        route_mean = ('route_grade', 'mean'),
+        route_max = ('route_grade', 'max'),
+        boulder_mean = ('boulder_grade', 'mean'),
+        boulder_max = ('boulder_grade', 'max'),
+        danger_factor = ('danger', 'mean'),
+        solos = ('solo', 'sum'),
+        hardest_solo = ('solo_grade', 'max'),
+        trad_count = ('trad', 'sum'),
+        sport_count = ('sport', 'sum'),
+        locations = ('location', 'nunique'),
+        success = ('onsight', 'sum'),
+        quarter_max1 = ('quarter_max1', 'max'),
+        quarter_max2 = ('quarter_max2', 'max'),
+        quarter_max3 = ('quarter_max3', 'max'),
+        quarter_max4 = ('quarter_max4', 'max'),
+        )
+    stats.insert(0, 'years_total', stats.last_date - stats.first_date)
+    stats = stats.drop(columns=['first_date', 'last_date'])
+    for column in ['solos', 'trad_count', 'sport_count', 'success']:
+        stats[column] = stats[column].astype(int)
+    return stats
+
+
+
+# create_climber_stats is climber_stats for a single climber's ticks
+def create_climber_stats(ticks):
+    return climber_stats(ticks.assign(user_id=0)).reset_index(drop=True)
+
+
+
+# batch_stats runs in the worker processes: csv texts of a batch of users in,
+# their stats (one row each, indexed by user id) out. Empty or unreadable
+# exports are left out, None if that's all of them
+def batch_stats(batch):
+    user_ticks = []
+    for user_id, csv_text in batch:
+        try:
+            ticks = create_user_ticks(io.StringIO(csv_text))
+        except Exception as e:
+            print(f"user {user_id}: skipped ({e!r})")
+            continue
+        if ticks.shape[0]:
+            user_ticks.append(ticks.assign(user_id=user_id))
+    if not user_ticks:
+        return None
+    return climber_stats(pd.concat(user_ticks, ignore_index=True))
+
+
+
+def _download(crawler, user_id, downloads):
+    try:
+        csv_text = crawler.fetch(get_csv_url(crawler, user_id)).text
+    except (requests.RequestException, KeyError) as e:
+        print(f"user {user_id}: download failed ({e!r})")
+        return
+    downloads.put((user_id, csv_text)) # blocks while the queue is full
+
+
+
+# _search_users yields the user ids found for each name, a name whose search
+# fails (after the crawler's retries) is skipped, not the rest of them
+def _search_users(crawler, names):
+    for name in names:
+        try:
+            user_ids = find_user_ids(crawler, name)
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"name {name}: search failed ({e!r})")
+            continue
+        yield from user_ids
+
+
+
+# _download_all is the download stage: every user found for every name goes
+# to the thread pool (unless it's in skip), and the exports end up in
+# `downloads`, followed by None
+def _download_all(crawler, names, downloads, workers, skip=()):
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            user_ids = unique(_search_users(crawler, names))
+            for user_id in user_ids:
+                if user_id not in skip:
+                    pool.submit(_download, crawler, user_id, downloads)
+    finally:
+        downloads.put(None)
+
+
+
+# StatsSink saves stats as they're worked out instead of at the end: every
+# batch becomes its own part-NNNNN.csv in directory, and the ids of every
+# user in it (with stats or not) go in done_ids.txt. A crash loses at most
+# the batches still being worked on, and a rerun skips the users in `done`
+class StatsSink:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.done_path = os.path.join(directory, 'done_ids.txt')
+        self.done = set()
+        if os.path.exists(self.done_path):
+            with open(self.done_path) as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self.part = len(self._parts())
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'part-*.csv')))
+
+    # write saves one batch: its stats first, then its ids as done (so ids
+    # are never marked done without their stats)
+    def write(self, user_ids, stats):
+        if stats is not None and len(stats):
+            path = os.path.join(self.directory, f'part-{self.part:05d}.csv')
+            stats.to_csv(path + '.tmp')
+            os.replace(path + '.tmp', path)
+            self.part += 1
+        with open(self.done_path, 'a') as f:
+            f.writelines(user_id + '\n' for user_id in user_ids)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(user_ids)
+
+    # read returns every part as one DataFrame (a user written twice, after
+    # a crash between the two steps of write, is only kept once)
+    def read(self):
+        parts = [pd.read_csv(path, index_col='user_id', dtype={'user_id': str}) for path in self._parts()]
+        if not parts:
+            return pd.DataFrame()
+        stats = pd.concat(parts)
+        stats['years_total'] = pd.to_timedelta(stats.years_total)
+        return stats[~stats.index.duplicated(keep='last')]
+
+
+
+# scrape returns the stats (one row per climber) of every user found for names
+# rate:             requests per second to mountain project, in total
+# download_workers: exports downloaded at once
+# stat_workers:     processes working out stats (defaults to one per cpu)
+# queue_size:       downloaded exports allowed to wait for a process
+# batch_size:       exports handed to a process at a time (stats for a batch
+#                   are one groupby, see climber_stats)
+# sink:             a StatsSink, each batch is written to it as soon as it
+#                   finishes (and not kept in memory), users already in it are
+#                   skipped. A crash loses the batches still being worked on
+#                   (up to 2*stat_workers), the one being filled and the
+#                   exports waiting in the queue, a rerun looks those users up again
+def scrape(names, rate=10, download_workers=16, stat_workers=None, queue_size=64, batch_size=50, sink=None):
+    crawler = Crawler(rate=rate, max_per_host=download_workers, workers=download_workers)
+    downloads = queue.Queue(maxsize=queue_size)
+    skip = sink.done if sink else ()
+    downloader = threading.Thread(target=_download_all, args=(crawler, names, downloads, download_workers, skip), daemon=True)
+    downloader.start()
+
+    stat_workers = stat_workers or os.cpu_count()
+    results = []
+    running = {} # future -> user ids in its batch
+
+    def finish(futures):
+        for future in futures:
+            user_ids = running.pop(future)
+            stats = future.result()
+            if sink:
+                sink.write(user_ids, stats)
+            elif stats is not None:
+                results.append(stats)
+
+    with ProcessPoolExecutor(stat_workers) as pool:
+        max_running = 2 * stat_workers
+        batch = []
+        while True:
+            # finished batches are written straight away, not when the pool fills up
+            finish([future for future in running if future.done()])
+            try:
+                download = downloads.get(timeout=1)
+            except queue.Empty:
+                continue
+            if download is None:
+                break
+            batch.append(download)
+            if len(batch) < batch_size:
+                continue
+            if len(running) >= max_running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                finish(done)
+            running[pool.submit(batch_stats, batch)] = [user_id for user_id, _ in batch]
+            batch = []
+        if batch:
+            running[pool.submit(batch_stats, batch)] = [user_id for user_id, _ in batch]
+        for future in as_completed(list(running)):
+            finish([future])
+    downloader.join()
+
+    if sink:
+        return sink.read()
+    if not results:
+        return pd.DataFrame()
+    results = pd.concat(results)
+    print(len(results), "climbers")
+    return results
+
+
+
+# run from the command line, the stats are saved as they go in <out dir>
+# (run it again to pick up where it stopped) and all together in <out dir>.csv
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("usage: climber_scrape.py <names.txt> <out dir>")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        names = [line.strip() for line in f if line.strip()]
+    out_dir = sys.argv[2].rstrip('/')
+    stats = scrape(names, sink=StatsSink(out_dir))
+    print(len(stats), "climbers")
+    stats.to_csv(out_dir + '.csv')
@@ -0,0 +1,178 @@
+"""
+Grade conversion tables (YDS for ropes, Hueco for boulders)
+
+These used to be scraped from mountain project every time a Pyramid was made.
+Now they ship with the app in grade_tables.json and are read once per process.
+
+To rebuild the tables from a saved copy of the grades page (no network needed):
+  python -m assets.grades refresh international-climbing-grades.html
+"""
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+GRADE_SOURCE = "https://www.mountainproject.com/international-climbing-grades"
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grade_tables.json')
+
+
+def load_grade_tables(path=TABLE_PATH):
+  """ returns (version, ropes_convert, boulder_convert) from the bundled json """
+  with open(path) as f:
+    tables = json.load(f)
+  # lists of pairs (not objects) so the order of the grades is kept
+  ropes_convert = dict((grade, value) for grade, value in tables['ropes'])
+  boulder_convert = dict((grade, value) for grade, value in tables['boulder'])
+  return tables['version'], ropes_convert, boulder_convert
+
+
+# loaded once, on first import
+GRADE_TABLE_VERSION, ropes_convert, boulder_convert = load_grade_tables()
+
+# categories for vectorized lookups (codes index straight into the values)
+_ROPE_GRADES = list(ropes_convert.keys())
+_ROPE_VALUES = np.array(list(ropes_convert.values()), dtype=float)
+_BOULDER_GRADES = list(boulder_convert.keys())
+_BOULDER_VALUES = np.array(list(boulder_convert.values()), dtype=float)
+
+# Rounding Key example:
+
+# 10a, 10-, 10a/b  -> 10a
+# 10b, 10          -> 10b
+# 10b/c, 10c, 10+  -> 10c
+# 10c/d, 10d       -> 10d
+
+# letter labels in order, along with the rounded number each one comes from
+_low = [(str(n)+s, n+d) for n in range(10) for s, d in [('-',0), ('',.4), ('+',.8)]]
+_high = [(str(n)+s, n+d) for n in range(10,16) for s, d in [('a',0), ('b',.25), ('c',.5), ('d',.75)]]
+ROUTE_LABELS = np.array([label for label, _ in _low + _high], dtype=object)
+ROUTE_BUCKETS = np.array([bucket for _, bucket in _low + _high])
+GRADES_LIST = list(ROUTE_LABELS[3:]) # pyramid schema starts at 5.1 ('1-')
+BOULDER_GRADES = ['V-easy'] + ['V'+str(n) for n in range(18)]
+
+
+def _lookup(tokens, grades, values):
+  codes = pd.Categorical(tokens, categories=grades).codes
+  return np.where(codes >= 0, values[codes], np.nan)
+
+
+def rope_values(grades):
+  """ numbers for YDS grades ('5.10a', '5.11+'...), NaN for anything not in the table """
+  return _lookup(grades, _ROPE_GRADES, _ROPE_VALUES)
+
+
+def boulder_values(grades):
+  """ numbers for Hueco grades ('V4', 'V-easy'...), NaN for anything not in the table """
+  return _lookup(grades, _BOULDER_GRADES, _BOULDER_VALUES)
+
+
+def round_grades(grades):
+  """ rounds back to decimals that can be reversed to letter grades
+  for 10 and greater, rounds down to nearest .25
+  eg. 11.49 -> 11.25, 11.51 -> 11.5
+  and sub 10 numbers n to n.0, n.4 or n.8 whichever is closest - rounds down in ties
+  """
+  grades = np.asarray(grades, dtype=float)
+  whole = np.floor(grades)
+  # halfway points between .0/.4/.8, side='left' so ties go to the lower one
+  low = whole + np.array([0, .4, .8])[np.searchsorted([.2, .6], grades - whole, side='left')]
+  high = np.floor(grades*4)/4
+  return np.where(grades >= 10, high, low)
+
+
+def grade_letters(buckets, boulder):
+  """
+  buckets: rounded grades (from round_grades)
+  boulder: boolean array (or a single bool), True for Hueco grades
+  returns letter grades ('10a', '9+', 'V4'...), NaN for anything off the charts
+  """
+  buckets = np.asarray(buckets, dtype=float)
+  boulder = np.broadcast_to(boulder, buckets.shape)
+  letters = np.full(buckets.shape, np.nan, dtype=object)
+
+  # routes: find the bucket in the ordered table and make sure it's an exact hit
+  idx = np.clip(np.searchsorted(ROUTE_BUCKETS, buckets - 1e-9), 0, len(ROUTE_BUCKETS) - 1)
+  hit = ~boulder & (np.abs(ROUTE_BUCKETS[idx] - buckets) < 1e-6)
+  letters[hit] = ROUTE_LABELS[idx[hit]]
+
+  # boulders: V-easy is -1, everything else is just the whole number
+  idx = np.floor(buckets) + 1
+  hit = boulder & (idx >= 0) & (idx < len(BOULDER_GRADES))
+  letters[hit] = np.array(BOULDER_GRADES, dtype=object)[idx[hit].astype(int)]
+  return letters
+
+
+def normalize_grades(ratings):
+  """
+  ratings: the "Rating" column of a tick export, eg. '5.10a', '5.8 R', '5.8 V0', 'V3-4', 'WI4'
+  returns a DataFrame (same index) with
+    grade:  number from the conversion tables (NaN for anything not YDS/Hueco, like WI)
+    bucket: grade rounded to something that maps back to a letter grade
+    letter: '10a', '9+', 'V3'...
+    boulder: whether the rating was read as a Hueco grade
+  """
+  ratings = pd.Series(ratings)
+  # a tick list only has a few dozen distinct ratings, so only parse those
+  # (blank ratings get code -1, which is pointed at an extra 'nan' entry)
+  codes, uniques = pd.factorize(ratings)
+  uniques = pd.Series(np.append(uniques.astype(str), 'nan'))
+  # mixed grades ('5.8 V0' or even '5.8 V-easy') are assumed to be boulders
+  vgrade = uniques.str.extract(r'(?:^|\s)(V\S*)', expand=False)
+  ygrade = uniques.str.extract(r'^\s*(5\S*)', expand=False)
+  boulder = vgrade.notna().to_numpy()
+  grade = np.where(boulder, boulder_values(vgrade),
+                            rope_values(ygrade))
+  bucket = round_grades(grade)
+  letter = grade_letters(bucket, boulder)
+  return pd.DataFrame({'grade': grade[codes], 'bucket': bucket[codes],
+                       'letter': letter[codes], 'boulder': boulder[codes]},
+                      index=ratings.index)
+
+
+def tables_from_html(snapshot):
+  """
+  snapshot: path (or url) of a saved copy of the mountain project grades page
+  returns (ropes_convert, boulder_convert) using the same numbering Pyramid always has
+  """
+  grade_chart = pd.read_html(snapshot)
+  old_ropes = grade_chart[0].YDSUSA[:-1].to_list()
+  new_ropes = [0,0,0,0,1,2,3,4,5,6,7,7.4,8,8.4,8.8,9,9.4,9.8]+list(np.round(np.arange(10,16,.1),1))
+  old_boulder = grade_chart[1].HuecoUSA[:-1].to_list()
+  new_boulder = np.insert(np.arange(0,17.5,.25),0,[-1])
+  # zip would silently drop grades if the page layout ever changes
+  if len(old_ropes) != len(new_ropes) or len(old_boulder) != len(new_boulder):
+    raise ValueError(f'unexpected grade chart in {snapshot}: {len(old_ropes)} YDS and {len(old_boulder)} Hueco grades')
+  ropes = dict(zip(old_ropes, [float(g) for g in new_ropes]))
+  boulder = dict(zip(old_boulder, [float(g) for g in new_boulder]))
+  return ropes, boulder
+
+
+def write_grade_tables(ropes, boulder, version, path=TABLE_PATH):
+  # one grade per line keeps diffs of the json readable
+  lines = ['{', f'  "version": {version},', f'  "source": "{GRADE_SOURCE}",']
+  for key, table in [('ropes', ropes), ('boulder', boulder)]:
+    pairs = ',\n'.join(f'    [{json.dumps(grade)}, {json.dumps(value)}]' for grade, value in table.items())
+    lines.append(f'  "{key}": [\n{pairs}\n  ]' + (',' if key == 'ropes' else ''))
+  lines.append('}')
+  with open(path, 'w') as f:
+    f.write('\n'.join(lines) + '\n')
+
+
+def refresh(snapshot, path=TABLE_PATH):
+  """ rebuild the bundled tables from a saved html page, bumping the version if anything changed """
+  ropes, boulder = tables_from_html(snapshot)
+  version, old_ropes, old_boulder = load_grade_tables(path)
+  if ropes == old_ropes and boulder == old_boulder:
+    print(f'grade tables unchanged (version {version})')
+    return version
+  write_grade_tables(ropes, boulder, version + 1, path)
+  print(f'grade tables updated to version {version + 1}')
+  return version + 1
+
+
+if __name__ == '__main__':
+  if len(sys.argv) != 3 or sys.argv[1] != 'refresh':
+    print('usage: python -m assets.grades refresh <saved grades page .html>')
+    sys.exit(1)
+  refresh(sys.argv[2])
@@ -0,0 +1,284 @@
+"""
+Hangboard workbooks as one typed table
+
+A workbook has a date column and one column per grip. Each cell is a
+comma separated string:
+  "-6,2,7,5,6,5"          weight, successful rounds, then how long each failed round lasted
+  "R,15,6:L,15,3,8,5,5"   one handed, the same for each hand
+The weight is relative to body weight, in kg or lb depending on the file
+name (nameHB_kg.xlsx, nameHB_lb.xlsx).
+
+read_workbook turns all of that into one row per date, grip and hand:
+  date, grip, hand ('both', 'L' or 'R'), weight, success, fail (number of
+  failed rounds written down), fail_time (seconds hung on them, in total),
+  fail_times (the seconds of each failed round, as written), unit ('kg' or 'lb')
+Everything else (validation, units, scores, plots) works on those columns,
+session_reps spreads them out to one row per round.
+Successful rounds are only written down as a count, so their times are
+never known, each one is taken to be the full hang.
+Parsed workbooks are cached next to the file (as feather, needs pyarrow)
+and only parsed again when the file changes.
+
+Weights stay in the unit they were written in, score_sessions converts
+them for display (a scale factor per row) and works out the effective weight
+of every hang at once.
+"""
+import glob
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import plotly.graph_objects as go
+
+SESSION_COLUMNS = ['date', 'grip', 'hand', 'weight', 'success', 'fail', 'fail_time', 'fail_times', 'unit']
+LB_PER_KG = 2.2046
+PENALTY = 2.5 # taken off the weight for failing everything / no time under tension (in the display unit)
+
+
+def _is_url(path):
+  return str(path).startswith(('http://', 'https://'))
+
+
+def workbook_unit(path):
+  """ 'TrevorHB_kg.xlsx' -> 'kg', anything without a _kg/_lb suffix is taken to be lb """
+  stem = os.path.splitext(os.path.basename(path))[0]
+  return 'kg' if stem.endswith('_kg') else 'lb'
+
+
+def athlete_name(path):
+  """ 'TrevorHB_maxhangs_lb.xlsx' -> 'Trevor' """
+  stem = os.path.splitext(os.path.basename(path))[0]
+  return stem.split('HB')[0] if 'HB' in stem else stem
+
+
+def parse_dates(dates):
+  """ the date column mixes strings ('26 Jun 2022') and dates excel already converted """
+  is_text = dates.map(lambda d: isinstance(d, str)).astype(bool)
+  text = pd.to_datetime(dates[is_text].str.strip(), format='%d %b %Y', errors='coerce')
+  # a few are typed a little differently ('2 June 2021', '29 Jun2021'), those go one at a time
+  typos = text.isna()
+  text[typos] = dates[is_text][typos].map(lambda d: pd.to_datetime(d, errors='coerce'))
+  converted = pd.to_datetime(dates[~is_text], errors='coerce')
+  return pd.concat([text, converted]).reindex(dates.index).dt.normalize()
+
+
+def parse_cells(cells):
+  """
+  cells: Series of cell strings (one hand cells already split into 'L,...'/'R,...')
+  returns (hand, weight, success, fail, fail_time, fail_times) arrays,
+  fail_times holding an array of seconds for each cell
+  """
+  cells = cells.astype(str).str.replace(' ', '', regex=False)
+  one_hand = cells.str.match(r'[LR],')
+  hand = np.where(one_hand, cells.str[0], 'both')
+  cells = cells.where(~one_hand, cells.str[2:])
+  numbers = cells.str.split(',', expand=True).apply(pd.to_numeric, errors='coerce')
+  numbers = numbers.reindex(columns=range(max(2, numbers.shape[1])))
+  fail_times = numbers.iloc[:, 2:].to_numpy(dtype=float)
+  written = ~np.isnan(fail_times)
+  fail = written.sum(axis=1)
+  # every written time in row order, cut back up into one array per cell
+  per_cell = np.empty(len(cells), dtype=object)
+  for i, times in enumerate(np.split(fail_times[written], np.cumsum(fail)[:-1]) if len(cells) else []):
+    per_cell[i] = times
+  return (hand, numbers[0].to_numpy(), numbers[1].to_numpy(),
+          fail, np.where(written, fail_times, 0).sum(axis=1), per_cell)
+
+
+def parse_workbook(path):
+  """ reads and parses a workbook (no caching, see read_workbook) """
+  df = pd.read_excel(path, dtype={'date': object})
+  df['date'] = parse_dates(df['date'])
+  long = df.melt(id_vars='date', var_name='grip', value_name='cell').dropna(subset=['cell'])
+  # one handed cells become one row per hand
+  long = long.assign(cell=long.cell.astype(str).str.split(':')).explode('cell')
+  long = long[long.cell.str.strip() != '']
+  hand, weight, success, fail, fail_time, fail_times = parse_cells(long.cell)
+  sessions = pd.DataFrame({
+    'date': long.date.to_numpy(),
+    'grip': long.grip.to_numpy(),
+    'hand': hand,
+    'weight': weight,
+    'success': success,
+    'fail': fail.astype('int64'),
+    'fail_time': fail_time,
+    'fail_times': fail_times,
+    'unit': workbook_unit(path),
+    })
+  sessions['cell'] = long.cell.to_numpy() # as written, for error messages
+  return sessions.sort_values(['date', 'grip', 'hand'], kind='stable').reset_index(drop=True)
+
+
+def _cache_path(path):
+  folder, name = os.path.split(os.path.abspath(path))
+  return os.path.join(folder, '.' + name + '.sessions.feather')
+
+
+def _read_cache(cache_path, key):
+  """ the cached sessions if they were parsed from the workbook as it is now (key), else None """
+  try:
+    table = feather.read_table(cache_path)
+    cached_key = json.loads((table.schema.metadata or {}).get(b'workbook_key', b'null'))
+  except (OSError, ValueError, pa.ArrowException):
+    return None
+  if cached_key != list(key):
+    return None
+  return table.to_pandas()
+
+
+def _write_cache(cache_path, key, sessions):
+  # the key goes in the file's own metadata, so replacing the file updates both at once
+  table = pa.Table.from_pandas(sessions, preserve_index=False)
+  metadata = dict(table.schema.metadata or {}, workbook_key=json.dumps(list(key)))
+  feather.write_feather(table.replace_schema_metadata(metadata), cache_path + '.tmp')
+  os.replace(cache_path + '.tmp', cache_path)
+
+
+def read_workbook(path, cache=True):
+  """
+  the parsed sessions of one workbook, from the cache file next to it if the
+  workbook hasn't changed (same size and modification time) since it was parsed.
+  The cache is plain feather (data, never code), so a folder shared with
+  others is safe to read from
+  """
+  if _is_url(path): # eg. github raw links, nothing to check for changes
+    return parse_workbook(path)
+  stat = os.stat(path)
+  key = (stat.st_mtime_ns, stat.st_size)
+  cache_path = _cache_path(path)
+  if cache and os.path.exists(cache_path):
+    sessions = _read_cache(cache_path, key)
+    if sessions is not None:
+      return sessions
+  sessions = parse_workbook(path)
+  if cache:
+    try:
+      _write_cache(cache_path, key, sessions)
+    except (OSError, pa.ArrowException):
+      pass # read only folder (or a column arrow can't store), parse every time
+  return sessions
+
+
+def session_reps(sessions, hangtime=10):
+  """
+  one row per round of every hang: date, grip, hand, rep (1, 2...), success
+  and seconds. Successful rounds come first (the order they're written down)
+  and last hangtime seconds, failed ones last what was written for them
+  """
+  success = sessions.success.fillna(0).clip(lower=0).to_numpy().astype('int64')
+  fails = sessions.fail_times.to_numpy()
+  counts = success + np.array([len(f) for f in fails], dtype='int64')
+  row = np.repeat(np.arange(len(sessions)), counts)
+  rep = np.arange(len(row)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+  is_success = rep <= success[row]
+  seconds = np.full(len(row), float(hangtime))
+  seconds[~is_success] = np.concatenate([np.asarray(f, dtype=float) for f in fails] + [np.empty(0)])
+  reps = sessions[['date', 'grip', 'hand']].iloc[row].reset_index(drop=True)
+  return reps.assign(rep=rep, success=is_success, seconds=seconds)
+
+
+def usual_rounds(sessions):
+  """ rounds per hang most often written down (6 for repeaters, 2 for max hangs) """
+  totals = (sessions.success + sessions.fail).dropna()
+  return int(totals.mode().iloc[0]) if len(totals) else 0
+
+
+def find_mistakes(sessions, rounds=None):
+  """
+  rows of sessions that don't add up: successful + failed rounds != rounds
+  (checked for each hand of one handed hangs) or numbers that couldn't be read.
+  rounds defaults to usual_rounds(sessions). Adds a 'problem' column
+  """
+  if rounds is None:
+    rounds = usual_rounds(sessions)
+  unreadable = sessions.weight.isna() | sessions.success.isna() | sessions.date.isna()
+  wrong_count = (sessions.success + sessions.fail) != rounds
+  problem = np.where(unreadable, 'unreadable', np.where(wrong_count, f'rounds != {rounds}', ''))
+  mistakes = sessions.assign(problem=problem)
+  return mistakes[problem != '']
+
+
+def workbook_paths(patterns):
+  """ files from any mix of workbook paths, folders and glob patterns """
+  if isinstance(patterns, str):
+    patterns = [patterns]
+  paths = []
+  for pattern in patterns:
+    if _is_url(pattern):
+      paths.append(pattern)
+    elif os.path.isdir(pattern):
+      paths += sorted(glob.glob(os.path.join(pattern, '*.xlsx')))
+    else:
+      paths += sorted(glob.glob(pattern)) or [pattern]
+  paths = [p if _is_url(p) else os.path.normpath(p) for p in paths if not os.path.basename(p).startswith('~$')] # excel lock files
+  return list(dict.fromkeys(paths))
+
+
+def read_sessions(patterns, cache=True):
+  """ sessions of many workbooks in one table, with an athlete and workbook column """
+  tables = []
+  for path in workbook_paths(patterns):
+    tables.append(read_workbook(path, cache).assign(athlete=athlete_name(path), workbook=os.path.basename(path)))
+  if not tables:
+    return pd.DataFrame(columns=SESSION_COLUMNS + ['cell', 'athlete', 'workbook'])
+  return pd.concat(tables, ignore_index=True)
+
+
+def unit_scale(units, unit):
+  """ what to multiply weights written in `units` (array of 'kg'/'lb') by to get `unit` """
+  to_lb = np.where(np.asarray(units) == 'kg', LB_PER_KG, 1.0)
+  return to_lb if unit == 'lb' else to_lb / LB_PER_KG
+
+
+def score_sessions(sessions, hangtime=10, rounds=None, unit='lb'):
+  """
+  sessions with these added/replaced:
+    weight: converted to unit (rounded to 0.1)
+    TUT: time under tension as a fraction of hangtime*rounds
+    penalty_factor: log6(rounds + 1 - success), 0 for no fails, 1 for one success out of 6
+    effective_weight: weight - PENALTY*penalty_factor - PENALTY*(1 - TUT)
+    series: the grip, with _L/_R for one handed hangs (one line each on the plots)
+  hangtime: seconds per round
+  rounds: rounds per hang (6 for repeaters, 2 for max hangs), defaults to usual_rounds
+  """
+  if rounds is None:
+    rounds = usual_rounds(sessions)
+  weight = np.round(sessions.weight.to_numpy(dtype=float) * unit_scale(sessions.unit, unit), 1)
+  success = sessions.success.to_numpy(dtype=float)
+  tut = (hangtime*success + sessions.fail_time.to_numpy(dtype=float)) / (hangtime*rounds)
+  with np.errstate(divide='ignore', invalid='ignore'): # more successes than rounds is a typo, find_mistakes reports those
+    penalty = np.log(rounds + 1 - success) / np.log(6)
+  hand = sessions.hand.to_numpy(dtype=object)
+  series = np.where(hand == 'both', sessions.grip.to_numpy(dtype=object), sessions.grip.to_numpy(dtype=object) + '_' + hand)
+  return sessions.assign(weight=weight, unit=unit, TUT=tut, penalty_factor=penalty,
+                         effective_weight=weight - PENALTY*penalty - PENALTY*(1 - tut), series=series)
+
+
+def progress_figure(scored, name, today, unit='lb', labels=True):
+  """
+  effective weight over time, one line per series (from score_sessions),
+  labelled on the right where each line ends (or in a legend with
+  labels=False, for figures that get points added to them later)
+  """
+  fig = go.Figure()
+  annotations = []
+  scored = scored.sort_values('date', kind='stable')
+  for series, hang in scored.groupby('series', sort=False):
+    fig.add_trace(go.Scatter(x=hang.date, y=hang.effective_weight, mode='lines+markers', name=series))
+    if labels:
+      annotations.append(dict(xref='paper', x=1, y=hang.effective_weight.iloc[-1],
+                              xanchor='left', yanchor='middle', text=f'{series}',
+                              font=dict(family='Arial', size=12), showarrow=False))
+  annotations.append(dict(xref='paper', yref='paper', x=0.0, y=1.05,
+                          xanchor='left', yanchor='bottom', text='Hangboard Progress',
+                          font=dict(family='Arial', size=30, color='rgb(37,37,37)'), showarrow=False))
+  annotations.append(dict(xref='paper', yref='paper', x=0.0, y=1,
+                          xanchor='left', yanchor='bottom', text=f'{name} - as of {today}',
+                          font=dict(family='Arial', size=20, color='rgb(37,37,37)'), showarrow=False))
+  fig.update_layout(annotations=annotations,
+                    showlegend=not labels, # the lines are labelled on the right instead
+                    xaxis=dict(tickformat='%d %b<br>%Y'),
+                    yaxis=dict(title=f'weight ({unit})'))
+  return fig
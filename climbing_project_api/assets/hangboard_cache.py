@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+from .hangboard import read_workbook, usual_rounds, workbook_paths, athlete_name, _is_url
+
+# columns that say whether a row is still what it was (the rest are parsed from cell)
+_ROW_KEY = ['date', 'grip', 'hand', 'cell']
+
+
+class Workbook:
+  def __init__(self, path, key, sessions, version=0):
+    """
+    One workbook as the hangboard page sees it.
+    key: (mtime, size) of the file when it was read (or the time, for urls)
+    sessions: read_workbook(path)
+    version: goes up whenever rows already shown change, so a figure built
+             from an older version has to be built again. Rows only added
+             at the end keep the version, the page just sends those
+    rounds: rounds per hang, fixed for a version (scores of old rows depend on it)
+    """
+    self.path = path
+    self.key = key
+    self.sessions = sessions
+    self.version = version
+    self.rounds = usual_rounds(sessions)
+    self.athlete = athlete_name(path)
+
+  def appended_to(self, old):
+    """ True if these sessions are old's sessions with rows added at the end """
+    n = len(old.sessions)
+    if len(self.sessions) < n or self.rounds != old.rounds:
+      return False
+    before = self.sessions[_ROW_KEY].iloc[:n].reset_index(drop=True)
+    return before.equals(old.sessions[_ROW_KEY].reset_index(drop=True))
+
+
+class HangboardCache:
+  def __init__(self, patterns, ttl=5*60):
+    """
+    Sessions of every workbook matching patterns (see hangboard.workbook_paths),
+    read once and only read again when a workbook changes (its modification
+    time or size), reading a changed workbook is still a single read_workbook.
+    ttl: seconds before a url is downloaded again (there's nothing to stat)
+    """
+    self.patterns = patterns
+    self.ttl = ttl
+    self._workbooks = {} # path -> Workbook
+    self._lock = threading.Lock()
+
+  def paths(self):
+    return workbook_paths(self.patterns) if self.patterns else []
+
+  def _key(self, path, old):
+    if _is_url(path):
+      if old is not None and time.monotonic() - old.key < self.ttl:
+        return old.key
+      return time.monotonic()
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+  def get(self, path):
+    """ the Workbook for path, read again first if the file changed """
+    with self._lock:
+      old = self._workbooks.get(path)
+      key = self._key(path, old)
+      if old is not None and old.key == key:
+        return old
+      workbook = Workbook(path, key, read_workbook(path))
+      if old is not None:
+        workbook.version = old.version if workbook.appended_to(old) else old.version + 1
+      self._workbooks[path] = workbook
+      return workbook
+
+  def clear(self):
+    with self._lock:
+      self._workbooks.clear()
+
+
+# workbooks for the dash page: HANGBOARD_WORKBOOKS is a comma separated list of
+# files, folders, glob patterns or urls, by default the workbooks in the repo
+_REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+hangboard_cache = HangboardCache([p.strip() for p in os.environ.get('HANGBOARD_WORKBOOKS', _REPO).split(',') if p.strip()])
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+class LocationTrie:
+  def __init__(self, locations, sep=' > '):
+    """
+    Prefix tree of the areas in a tick list
+    locations: mountain project location strings, eg. 'California > Joshua Tree National Park > Real Hidden Valley'
+    Each node is a dict of {sub area: node}. Children of every path are also
+    kept in a flat dict so a lookup doesn't have to walk down the tree.
+    """
+    self.sep = sep
+    self.root = {}
+    self._children = {(): []} # path (tuple of areas) -> list of sub areas, in order first seen
+    for location in locations:
+      if not isinstance(location, str): # blank locations come through as NaN
+        continue
+      node = self.root
+      path = ()
+      for area in location.split(sep):
+        if area not in node:
+          node[area] = {}
+          self._children[path].append(area)
+          self._children[path + (area,)] = []
+        node = node[area]
+        path = path + (area,)
+    self._number_paths()
+
+  def _number_paths(self):
+    # number the areas in depth first order (euler tour), so every area and
+    # everything below it is one block of ids: [start, end)
+    self.intervals = {} # path -> (start, end)
+    next_id = 0
+    stack = [((), self.root, False)]
+    while stack:
+      path, node, done = stack.pop()
+      if done:
+        self.intervals[path] = (self.intervals[path][0], next_id)
+        continue
+      self.intervals[path] = (next_id, None)
+      next_id += 1
+      stack.append((path, node, True))
+      for area in reversed(list(node)): # reversed so they come off the stack in order
+        stack.append((path + (area,), node[area], False))
+
+  def path_ids(self, locations):
+    """
+    locations: Series of location strings (each one already in the tree)
+    returns an int array with the id of each location's full path, -1 if unknown
+    only the distinct locations are looked up, the rest is an index into them
+    """
+    codes, uniques = pd.factorize(pd.Series(locations))
+    ids = np.array([self.intervals.get(tuple(u.split(self.sep)), (-1,))[0] for u in uniques] + [-1], dtype=int)
+    return ids[codes] # code -1 (blank location) picks the trailing -1
+
+  def mask(self, path_ids, sub_location):
+    """
+    path_ids: ids from path_ids()
+    sub_location: list of areas starting from the state, eg. ['California', 'Joshua Tree National Park']
+    returns a boolean array, True for ticks in (or below) that area
+    """
+    path_ids = np.asarray(path_ids)
+    path = tuple(sub_location)
+    if path in self.intervals:
+      start, end = self.intervals[path]
+      return (path_ids >= start) & (path_ids < end)
+    # not a path from the top (eg. just ['Joshua Tree National Park']), fall back to
+    # "every area is somewhere in the location", checked once per distinct path
+    matches = [start for p, (start, _) in self.intervals.items() if all(area in p for area in sub_location)]
+    return np.isin(path_ids, matches)
+
+  def children(self, path=()):
+    """ sub areas directly under path, eg. ['California'] -> ['Joshua Tree National Park', 'Yosemite'] """
+    return self._children.get(tuple(path), [])
+
+  def __contains__(self, path):
+    return tuple(path) in self._children
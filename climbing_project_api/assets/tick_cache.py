@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+from .pyramid_class import Ticks
+
+class TickCache:
+  def __init__(self, maxsize=32, ttl=15*60):
+    """
+    Parsed tick exports keyed by url, so the dash callbacks for one click
+    share a single download instead of each reading the csv again.
+    maxsize: number of urls kept, least recently used is dropped first
+    ttl: seconds before a url is downloaded again (to pick up new ticks)
+    """
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self._entries = OrderedDict() # url -> (time loaded, Ticks)
+    self._loading = {} # url -> lock, so simultaneous callbacks wait for one download
+    self._lock = threading.Lock()
+
+  def _lookup(self, url):
+    entry = self._entries.get(url)
+    if entry is None:
+      return None
+    loaded, ticks = entry
+    if time.monotonic() - loaded > self.ttl:
+      del self._entries[url]
+      return None
+    self._entries.move_to_end(url)
+    return ticks
+
+  def get(self, url):
+    with self._lock:
+      ticks = self._lookup(url)
+      if ticks is not None:
+        return ticks
+      url_lock = self._loading.setdefault(url, threading.Lock())
+
+    with url_lock: # download outside the main lock so other urls aren't held up
+      try:
+        with self._lock:
+          ticks = self._lookup(url)
+        if ticks is None:
+          ticks = Ticks(url)
+          with self._lock:
+            self._entries[url] = (time.monotonic(), ticks)
+            while len(self._entries) > self.maxsize:
+              self._entries.popitem(last=False)
+      finally: # a failed download mustn't leave its lock behind for good
+        with self._lock:
+          self._loading.pop(url, None)
+    return ticks
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+
+tick_cache = TickCache()
+
+def get_ticks(url):
+  return tick_cache.get(str(url).strip())
@@ -0,0 +1,83 @@
+"""
+Reading mountain project tick exports
+
+Only the columns something actually uses are read, with their types given up
+front instead of inferred. Exports can also be read in chunks so a huge tick
+list never has to be in memory all at once.
+"""
+import warnings
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+TICK_COLUMNS = ['Date', 'Route', 'Rating', 'Style', 'Lead Style', 'Route Type', 'Location', 'Length', 'Pitches']
+
+# Style and Lead Style share categories, bouldering ticks have no lead style and get their style copied over.
+# A style mountain project adds later is kept (with a warning) as an extra category, never dropped to NaN
+TICK_STYLES = CategoricalDtype(['Lead', 'Solo', 'TR', 'Follow', 'Send', 'Flash', 'Attempt',
+                                'Onsight', 'Redpoint', 'Pinkpoint', 'Fell/Hung'])
+STYLE_COLUMNS = ['Style', 'Lead Style']
+TICK_DTYPES = {
+  'Date': str,
+  'Route': str,
+  'Rating': str,
+  'Style': str, # made TICK_STYLES (plus anything unknown) by _set_styles
+  'Lead Style': str,
+  'Route Type': 'category', # combinations like "Trad, Sport" so categories aren't fixed
+  'Location': 'category',
+  'Length': 'float64',
+  'Pitches': 'float64',
+  }
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def _read_csv(document, columns, **kwargs):
+  dtypes = {c: TICK_DTYPES[c] for c in columns if c in TICK_DTYPES}
+  return pd.read_csv(document, usecols=columns, dtype=dtypes, **kwargs)
+
+def _set_styles(ticks, warn=True):
+  """ Style and Lead Style as one shared categorical, TICK_STYLES plus any style it doesn't know """
+  columns = [c for c in STYLE_COLUMNS if c in ticks]
+  if not columns:
+    return ticks
+  known = set(TICK_STYLES.categories)
+  unknown = sorted(set().union(*(ticks[c].dropna().astype(str) for c in columns)) - known)
+  dtype = TICK_STYLES
+  if unknown:
+    if warn:
+      warnings.warn('unknown tick styles kept as extra categories: {}'.format(', '.join(unknown)))
+    dtype = CategoricalDtype(list(TICK_STYLES.categories) + unknown)
+  for column in columns:
+    ticks[column] = ticks[column].astype(object).astype(dtype)
+  return ticks
+
+def _parse(ticks, warn=True):
+  if 'Date' in ticks:
+    ticks['Date'] = pd.to_datetime(ticks['Date'], format=DATE_FORMAT)
+  return _set_styles(ticks, warn)
+
+
+def iter_ticks(document, columns=TICK_COLUMNS, chunksize=10000):
+  """ yields the export chunksize rows at a time (each chunk is a parsed DataFrame) """
+  for chunk in _read_csv(document, columns, chunksize=chunksize):
+    yield _parse(chunk)
+
+
+def concat_ticks(chunks):
+  """ joins chunks back together, keeping open-ended categoricals as categoricals """
+  ticks = pd.concat(list(chunks), ignore_index=True)
+  for column, dtype in TICK_DTYPES.items():
+    # chunks with different categories come back as object columns
+    if dtype == 'category' and column in ticks and ticks[column].dtype.name != 'category':
+      ticks[column] = ticks[column].astype('category')
+  return _set_styles(ticks, warn=False) # chunks with different unknown styles, already warned about
+
+
+def read_ticks(document, columns=TICK_COLUMNS, chunksize=None):
+  """
+  document: url or path of a tick export
+  columns: which export columns to read (defaults to everything used in this project)
+  chunksize: read in pieces of this many rows (bounded memory while parsing)
+  """
+  if chunksize:
+    return concat_ticks(iter_ticks(document, columns, chunksize))
+  return _parse(_read_csv(document, columns))
@@ -0,0 +1,128 @@
+"""
+Local columnar store of tick exports (one folder of feather files per climber)
+
+Ticks are saved with their grades already normalized, so analysis can skip
+both the download and the csv parsing. A refresh only writes the ticks newer
+than what's stored, as a new part file, and parts are memory mapped on load.
+
+Needs pyarrow (pip install pyarrow)
+"""
+import os
+import re
+import pandas as pd
+import pyarrow.feather as feather
+from .grades import normalize_grades
+from .tick_loader import read_ticks, concat_ticks
+from .pyramid_class import Ticks
+
+PART_NAME = '{:05d}-{:%Y%m%d}.feather' # part number, first date in the part
+PART_PATTERN = re.compile(r'(\d{5})-(\d{8})\.feather$')
+
+
+def user_key(document):
+  """ '.../user/109791883/trevor-clack/tick-export' -> '109791883-trevor-clack' """
+  parts = [p for p in str(document).split('/') if p]
+  if len(parts) >= 3 and parts[-1] == 'tick-export':
+    return '-'.join(parts[-3:-1])
+  return parts[-2] if len(parts) >= 2 else parts[-1]
+
+
+def normalize_ticks(ticks):
+  """ raw export rows plus grade, bucket, letter and boulder columns """
+  return pd.concat([ticks.reset_index(drop=True), normalize_grades(ticks.Rating).reset_index(drop=True)], axis=1)
+
+
+class TickStore:
+  def __init__(self, root='tick_store'):
+    """ root: folder holding one sub folder per climber """
+    self.root = root
+
+  def _folder(self, document):
+    return os.path.join(self.root, user_key(document))
+
+  def _parts(self, document):
+    """ [(start date, path)] oldest first """
+    folder = self._folder(document)
+    if not os.path.isdir(folder):
+      return []
+    parts = []
+    for name in sorted(os.listdir(folder)):
+      match = PART_PATTERN.match(name)
+      if match:
+        parts.append((pd.Timestamp(match.group(2)), os.path.join(folder, name)))
+    return parts
+
+  def _read(self, path, columns=None):
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+  def last_date(self, document):
+    parts = self._parts(document)
+    if not parts:
+      return None
+    return self._read(parts[-1][1], columns=['Date']).Date.max()
+
+  def refresh(self, document, ticks=None):
+    """
+    Add ticks newer than the last stored date. Ticks from the last stored day
+    are written again, in case more were logged that day after the last refresh
+    (load() prefers the newer part for days they overlap).
+    ticks: an already read export, otherwise document is downloaded
+    returns the number of rows written
+    """
+    if ticks is None:
+      ticks = read_ticks(document)
+    parts = self._parts(document)
+    start = None
+    if parts:
+      last = self._read(parts[-1][1], columns=['Date']).Date
+      start = last.max()
+      ticks = ticks[ticks.Date >= start]
+      # nothing new if the last day is the same as what's stored
+      if (ticks.Date == start).sum() == (last == start).sum() and not (ticks.Date > start).any():
+        return 0
+    if ticks.empty:
+      return 0
+    if start is None:
+      start = ticks.Date.min()
+
+    folder = self._folder(document)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, PART_NAME.format(len(parts), start))
+    # uncompressed so the file can be memory mapped straight back in
+    feather.write_feather(normalize_ticks(ticks), path, compression='uncompressed')
+    return len(ticks)
+
+  def load(self, document):
+    """ every stored tick (normalized) for this climber, None if nothing is stored """
+    parts = self._parts(document)
+    if not parts:
+      return None
+    frames = []
+    for i, (start, path) in enumerate(parts):
+      frame = self._read(path)
+      if i + 1 < len(parts): # the next part starts over from its first day
+        frame = frame[frame.Date < parts[i + 1][0]]
+      frames.append(frame)
+    return concat_ticks(frames)
+
+  def compact(self, document):
+    """
+    rewrite all parts as a single file. The merged file replaces part 0 before
+    any other part is deleted (oldest first), so a crash part way leaves the merged part plus
+    some old ones, which load() reads the same as before (each part only up
+    to where the next one starts)
+    """
+    parts = self._parts(document)
+    if len(parts) < 2:
+      return
+    ticks = self.load(document)
+    path = os.path.join(self._folder(document), PART_NAME.format(0, ticks.Date.min()))
+    feather.write_feather(ticks, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+    for _, old in parts:
+      if old != path:
+        os.remove(old)
+
+  def ticks(self, document):
+    """ stored ticks as a Ticks object, ready for Pyramid(document, ticks=...) """
+    return Ticks(document, raw=self.load(document))
@@ -0,0 +1,135 @@
+import datetime as dt
+import dash
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+import plotly.graph_objs as go
+from app import app
+from assets.hangboard import score_sessions, progress_figure
+from assets.hangboard_cache import hangboard_cache
+
+HANGTIME = 10 # seconds per round
+REFRESH = 60 # seconds between checks for new sessions
+
+"""
+The figure is built once per workbook/hands/unit. After that the page checks
+the workbook every REFRESH seconds (hangboard_cache only reads it again if
+it changed) and sends just the new sessions as extendData, so a day of new
+hangs costs a day of new points. The figure is built again only when rows
+that are already on it change (an edited or deleted entry, a new grip).
+"""
+
+### Layouts
+column1 = dbc.Col([
+
+    dcc.Markdown(
+            """
+            ## Hangboard Progress
+
+            Effective weight of every hang (weight less a penalty for
+            failed rounds), updated as sessions are logged
+            """
+            ),
+
+    html.Label('Workbook'),
+    dcc.Dropdown(
+        id='hangboard-workbook',
+        placeholder='Pick a workbook',
+        ),
+
+    html.Br(),
+
+    dcc.RadioItems(
+        id='hangboard-hands',
+        options=[
+            {'label':'two handed', 'value':'both'},
+            {'label':'one handed', 'value':'one'},
+            ],
+        value='both',
+        style={'display':'grid',"grid-template-columns": "repeat(2,1fr)"}),
+
+    html.Br(),
+
+    dcc.RadioItems(
+        id='hangboard-unit',
+        options=[
+            {'label':'lb', 'value':'lb'},
+            {'label':'kg', 'value':'kg'},
+            ],
+        value='lb',
+        style={'display':'grid',"grid-template-columns": "repeat(2,1fr)"}),
+    ], md=3)
+
+fig = go.Figure()
+fig.update_layout(title_text="No Workbook Yet")
+
+column2 = dbc.Col(
+        [
+            dcc.Graph(
+                id='hangboard-graph',
+                figure=fig),
+            dcc.Interval(id='hangboard-interval', interval=REFRESH*1000),
+            # what the graph was built from and how many sessions it has
+            dcc.Store(id='hangboard-shown'),
+            ]
+        )
+layout = dbc.Row([column1,column2])
+
+
+def pick_hands(sessions, hands):
+    return sessions[sessions.hand == 'both'] if hands == 'both' else sessions[sessions.hand != 'both']
+
+
+def extend_data(scored, series):
+    """ the points of scored as extendData for the traces named in series """
+    x, y, traces = [], [], []
+    for name, hang in scored.sort_values('date', kind='stable').groupby('series', sort=False):
+        x.append(hang.date.dt.strftime('%Y-%m-%d').tolist())
+        y.append(hang.effective_weight.tolist())
+        traces.append(series.index(name))
+    return [dict(x=x, y=y), traces]
+
+
+@app.callback(
+        Output('hangboard-workbook','options'),
+        [Input('hangboard-interval','n_intervals')])
+def list_workbooks(n_intervals):
+    return [{'label': path.rsplit('/', 1)[-1].split('?')[0], 'value': path} for path in hangboard_cache.paths()]
+
+
+@app.callback(
+        [Output('hangboard-graph','figure'),
+         Output('hangboard-graph','extendData'),
+         Output('hangboard-shown','data')],
+        [Input('hangboard-interval','n_intervals'),
+         Input('hangboard-workbook','value'),
+         Input('hangboard-hands','value'),
+         Input('hangboard-unit','value')],
+        [State('hangboard-shown','data')])
+def update_progress(n_intervals, path, hands, unit, shown):
+    if not path or path not in hangboard_cache.paths():
+        raise PreventUpdate # only the workbooks offered in the dropdown, never a path sent by the browser
+    workbook = hangboard_cache.get(path)
+    view = {'path': path, 'hands': hands, 'unit': unit, 'version': workbook.version}
+    rows = len(workbook.sessions)
+
+    if shown and all(shown.get(k) == v for k, v in view.items()):
+        if rows == shown['rows']:
+            raise PreventUpdate # nothing new
+        new = pick_hands(workbook.sessions.iloc[shown['rows']:], hands)
+        scored = score_sessions(new, HANGTIME, workbook.rounds, unit)
+        if set(scored.series) <= set(shown['series']):
+            shown = dict(shown, rows=rows)
+            if scored.empty: # new sessions, just not for these hands
+                return dash.no_update, dash.no_update, shown
+            return dash.no_update, extend_data(scored, shown['series']), shown
+        # a new grip needs a new trace, build it all again
+
+    scored = score_sessions(pick_hands(workbook.sessions, hands), HANGTIME, workbook.rounds, unit)
+    today = dt.datetime.today().strftime('%d %b %Y')
+    fig = progress_figure(scored, workbook.athlete, today, unit, labels=False) # labels on the right wouldn't follow new points
+    fig.update_layout(height=700)
+    series = [trace.name for trace in fig.data]
+    return fig, dash.no_update, dict(view, rows=rows, series=series)
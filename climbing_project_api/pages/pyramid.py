@@ -12,10 +12,10 @@ import visdcc
 import plotly.graph_objs as go
 import numpy as np
 import json
-import networkx as nx
 from app import app
 # import data
 from assets.pyramid_class import *
+from assets.tick_cache import get_ticks
 
 ### Layouts
 column1 = dbc.Col([
@@ -159,8 +159,8 @@ def make_pyramid(n_clicks,url,style, lead_style,
             location_choices.append(location4)
         print(location_choices)
         document = str(url)
-        P = Pyramid(document,location_choices)
-        fig = P.show_pyramids((style,lead_style))
+        P = get_ticks(document).pyramid(location_choices) # same location again reuses its pyramids
+        fig = P.show_pyramids((style,lead_style), aggregate=True) # one bar per grade, not per tick
         return fig
 
 # Populate dropdowns
@@ -175,7 +175,7 @@ def show_location1(url):
         raise PreventUpdate
     else:
         document = str(url)
-        location_list = pd.read_csv(document).Location.unique()
+        location_list = get_ticks(document).locations
         if any(location_list):
             return {'display':'inline'}
         else:
@@ -189,34 +189,9 @@ def update_location_dropdown1(n_clicks, url):
     if url is None:
         raise PreventUpdate
     else:
-        document = str(url)
-        #global LOCATION_LIST # make accessible by other dropdowns
-        location_list = pd.read_csv(document).Location.unique()
-        top = []
-        edge_list = []
-        node_list = []
-        for l in location_list:
-            sub_list = l.split(' > ')
-            first_item = sub_list[0]
-            if not first_item in top:
-                top.append(first_item)
-            for i in range(0, len(sub_list)):
-                if not sub_list[i] in node_list:
-                    node_list.append(sub_list[i])
-                if i == len(sub_list)-1:
-                    break
-
-                pair = '>'.join([sub_list[i],sub_list[i+1]])
-                if not pair in edge_list:
-                    edge_list.append(pair)
-        # make global graphs object with all this
-        global G # G is graph object that contains all areas + sub-areas
-        G = nx.DiGraph()
-        for node in node_list:
-            G.add_node(node)
-        for edge in edge_list:
-            source, child = edge.split('>')
-            G.add_edge(source,child)
+        # the location tree is built once per tick list and lives with the cached ticks,
+        # so users looking at different tick lists don't overwrite each other's dropdowns
+        top = get_ticks(str(url)).location_tree.children()
         return [{'label': choice,'value':choice} for choice in top]
 
 
@@ -232,12 +207,13 @@ def show_location2(location1):
 
 @app.callback(
         Output('location-dropdown-2','options'),
-        [Input('location-dropdown-1','value')])
-def update_location_dropdown2(location1):
-    if location1 is None:
+        [Input('location-dropdown-1','value'),
+         State('ticks-url', 'value')])
+def update_location_dropdown2(location1, url):
+    if location1 is None or url is None:
         raise PreventUpdate
     else:
-        options = G.successors(location1)
+        options = get_ticks(str(url)).location_tree.children([location1])
         return [{'label': option,'value':option} for option in options]
 
 # LOCATION 3
@@ -252,12 +228,14 @@ def show_location3(location2):
 
 @app.callback(
         Output('location-dropdown-3','options'),
-        [Input('location-dropdown-2','value')])
-def update_location_dropdown3(location2):
-    if location2 is None:
+        [Input('location-dropdown-2','value'),
+         State('location-dropdown-1','value'),
+         State('ticks-url', 'value')])
+def update_location_dropdown3(location2, location1, url):
+    if location2 is None or url is None:
         raise PreventUpdate
     else:
-        options = G.successors(location2)
+        options = get_ticks(str(url)).location_tree.children([location1, location2])
         return [{'label': option,'value':option} for option in options]
 
 # LOCATION 4
@@ -272,10 +250,13 @@ def show_location4(location3):
 
 @app.callback(
         Output('location-dropdown-4','options'),
-        [Input('location-dropdown-3','value')])
-def update_location_dropdown4(location3):
-    if location3 is None:
+        [Input('location-dropdown-3','value'),
+         State('location-dropdown-1','value'),
+         State('location-dropdown-2','value'),
+         State('ticks-url', 'value')])
+def update_location_dropdown4(location3, location1, location2, url):
+    if location3 is None or url is None:
         raise PreventUpdate
     else:
-        options = G.successors(location3)
+        options = get_ticks(str(url)).location_tree.children([location1, location2, location3])
         return [{'label': option,'value':option} for option in options]
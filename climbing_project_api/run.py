@@ -5,7 +5,7 @@ import dash_html_components as html
 from dash.dependencies import Input, Output
 
 from app import app, server
-from pages import index, pyramid # predictions, insights, process
+from pages import index, pyramid, hangboard # predictions, insights, process
 
 """
 https://dash-bootstrap-components.opensource.faculty.ai/l/components/navbar
@@ -28,6 +28,7 @@ navbar = dbc.NavbarSimple(
     brand_href='/', 
     children=[
         dbc.NavItem(dcc.Link('Pyramid', href='/pyramid', className='nav-link')), 
+        dbc.NavItem(dcc.Link('Hangboard', href='/hangboard', className='nav-link')), 
         #dbc.NavItem(dcc.Link('Insights', href='/insights', className='nav-link')), 
         #dbc.NavItem(dcc.Link('Process', href='/process', className='nav-link')), 
     ],
@@ -73,6 +74,8 @@ def display_page(pathname):
         return index.layout
     elif pathname == '/pyramid':
         return pyramid.layout
+    elif pathname == '/hangboard':
+        return hangboard.layout
     #elif pathname == '/insights':
     #    return insights.layout
     #elif pathname == '/process':
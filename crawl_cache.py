@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# On-disk helpers for area_crawler.py:
+#
+# ResponseCache keeps every page fetched (one .html + .json pair per url).
+# Pages younger than `fresh_for` are reused without asking mountain project
+# at all, older ones are revalidated with If-None-Match/If-Modified-Since
+# (a 304 costs a request but no download), and pages older than `max_age`
+# are deleted.
+#
+# CrawlCheckpoint saves the crawl's progress (areas visited, areas still to
+# visit, routes found) every so often, so a crawl that dies can pick up
+# where it stopped. Each save only appends what changed since the last one.
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import hashlib
+import json
+import os
+import time
+
+DAY = 24 * 60 * 60
+
+
+
+# _public_url drops the api key from a url, it shouldn't end up in the cache
+def _public_url(url):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != 'key']
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+
+# _write_atomic replaces path in one step, so a crash never leaves half a file
+def _write_atomic(path, text):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+
+class ResponseCache:
+    def __init__(self, directory, fresh_for=14 * DAY, max_age=180 * DAY):
+        self.directory = directory
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(_public_url(url).encode()).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.html', base + '.json'
+
+    # lookup returns the cached entry (a dict with 'body', 'etag',
+    # 'last_modified' and 'fetched') or None
+    def lookup(self, url):
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                entry = json.load(f)
+            with open(body_path) as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry['fetched'] > self.max_age:
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry['fetched'] < self.fresh_for
+
+    # validators are the headers that ask the server "only send it if it changed"
+    def validators(self, entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response):
+        body_path, meta_path = self._paths(url)
+        _write_atomic(body_path, response.text)
+        meta = {'url': _public_url(url), 'fetched': time.time(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
+        _write_atomic(meta_path, json.dumps(meta))
+
+    # touch marks an entry as checked just now (after a 304 Not Modified)
+    def touch(self, url, entry):
+        _, meta_path = self._paths(url)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        meta['fetched'] = time.time()
+        _write_atomic(meta_path, json.dumps(meta))
+
+    # evict deletes everything older than max_age
+    def evict(self):
+        now = time.time()
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            try:
+                with open(meta_path) as f:
+                    fetched = json.load(f)['fetched']
+            except (OSError, ValueError, KeyError):
+                fetched = 0
+            if now - fetched > self.max_age:
+                for path in (meta_path, meta_path[:-len('.json')] + '.html'):
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+        return removed
+
+
+
+# Saving only ever appends: the route links found so far go in path + '.routes'
+# (one per line) and the areas in path + '.areas', a line "+url" when an area
+# is first seen and "-url" once it's been fetched. The areas still pending are
+# the ones seen but not fetched, in the order they were seen (the crawl's queue
+# order). The file at path itself only holds how many lines of each were
+# saved, so a save costs the pages since the last one rather than the whole crawl
+class CrawlCheckpoint:
+    def __init__(self, path):
+        self.path = path
+        self.routes_path = path + '.routes'
+        self.areas_path = path + '.areas'
+        self.route_count = 0
+        self.area_count = 0
+
+    # _truncate drops whatever was appended to path after its first `lines` lines
+    @staticmethod
+    def _truncate(path, lines):
+        if os.path.exists(path):
+            with open(path, 'r+b') as f:
+                for _ in range(lines):
+                    f.readline()
+                f.truncate(f.tell())
+
+    # load returns the saved state for a crawl of start_url ('pending' and
+    # 'seen' areas), or None
+    def load(self, start_url):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('start') != start_url:
+            return None
+        self.route_count = state['route_count']
+        self.area_count = state['area_count']
+        # lines appended after the last save belong to pages still pending, drop them
+        self._truncate(self.routes_path, self.route_count)
+        self._truncate(self.areas_path, self.area_count)
+        seen = {}  # url -> still pending, a dict keeps the order they were seen
+        if os.path.exists(self.areas_path):
+            with open(self.areas_path) as f:
+                for line in f:
+                    seen[line[1:].rstrip('\n')] = line.startswith('+')
+        state['seen'] = list(seen)
+        state['pending'] = [url for url, pending in seen.items() if pending]
+        return state
+
+    # route_links streams the links saved so far, after load()
+    def route_links(self):
+        if not os.path.exists(self.routes_path):
+            return
+        with open(self.routes_path) as f:
+            for line in f:
+                yield line.rstrip('\n')
+
+    # new_seen are the areas first seen since the last save (oldest first),
+    # new_done the ones fetched since then and new_route_links the routes
+    # they had. Pages still being fetched are neither done nor lost
+    def save(self, start_url, new_seen, new_done, new_route_links):
+        new_route_links = list(new_route_links)
+        with open(self.routes_path, 'a') as f:
+            f.writelines(link + '\n' for link in new_route_links)
+        self.route_count += len(new_route_links)
+        areas = ['+' + url for url in new_seen] + ['-' + url for url in new_done]
+        with open(self.areas_path, 'a') as f:
+            f.writelines(line + '\n' for line in areas)
+        self.area_count += len(areas)
+        state = {'start': start_url, 'route_count': self.route_count, 'area_count': self.area_count}
+        _write_atomic(self.path, json.dumps(state))
+
+    def remove(self):
+        for path in (self.path, self.routes_path, self.areas_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.route_count = 0
+        self.area_count = 0
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# Writes waypoints straight to .gpx (or .kml) files, in place of building a
+# csv and handing it to gpsbabel.
+#
+# A waypoint is (latitude, longitude, name, description). Waypoints are
+# written one at a time as they come, so any iterable works (a list, a
+# generator, waypoint_table(df).itertuples(index=False)).
+# Names and descriptions are escaped for xml, so commas, quotes, & and < in
+# route names come through as they are.
+
+from xml.sax.saxutils import escape
+import os
+import re
+
+# characters xml 1.0 doesn't allow at all (mostly control characters)
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+
+def _text(value):
+    return escape(_INVALID_XML.sub('', str(value)))
+
+
+
+# waypoint_table makes one waypoint per wall out of the route table from
+# Crawler.route_details (route, location, longitude, latitude): the position
+# of the wall's first route that has both coordinates (lat and lon always from
+# the same route), the last part of the location as its name and all its
+# routes (separated by 3 spaces) as the description. Walls without any
+# coordinates are left out, there's nowhere to put them. Walls keep the order
+# they first appear in, ready for write_gpx(path, table.itertuples(index=False))
+def waypoint_table(df):
+    first = df.dropna(subset=['latitude', 'longitude']).drop_duplicates('location')
+    walls = first.set_index('location')[['latitude', 'longitude']]
+    walls.columns = ['lat', 'lon']
+    walls['desc'] = df.groupby('location', sort=False)['route'].agg('   '.join)
+    walls['name'] = walls.index.str.split('-').str[-1]
+    return walls[['lat', 'lon', 'name', 'desc']].reset_index(drop=True)
+
+
+
+# write_gpx writes the waypoints to path, returns how many were written
+# name: name of the file as shown on the gps (defaults to the file name)
+def write_gpx(path, waypoints, name=None):
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.1" creator="gpsgrabber" xmlns="http://www.topografix.com/GPX/1/1">\n')
+        f.write(f'  <metadata><name>{_text(name)}</name></metadata>\n')
+        for lat, lon, wpt_name, desc in waypoints:
+            # most gps units only show cmt, desc is there for everything else (like gpsbabel did)
+            f.write(f'  <wpt lat="{float(lat)}" lon="{float(lon)}">\n'
+                    f'    <name>{_text(wpt_name)}</name>\n'
+                    f'    <cmt>{_text(desc)}</cmt>\n'
+                    f'    <desc>{_text(desc)}</desc>\n'
+                    f'  </wpt>\n')
+            count += 1
+        f.write('</gpx>\n')
+    return count
+
+
+
+# write_kml is write_gpx for google earth/maps
+def write_kml(path, waypoints, name=None):
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n')
+        f.write(f'  <name>{_text(name)}</name>\n')
+        for lat, lon, wpt_name, desc in waypoints:
+            # kml wants longitude first
+            f.write(f'  <Placemark>\n'
+                    f'    <name>{_text(wpt_name)}</name>\n'
+                    f'    <description>{_text(desc)}</description>\n'
+                    f'    <Point><coordinates>{float(lon)},{float(lat)}</coordinates></Point>\n'
+                    f'  </Placemark>\n')
+            count += 1
+        f.write('</Document>\n</kml>\n')
+    return count
+
+
+
+WRITERS = {'gpx': write_gpx, 'kml': write_kml}
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Scores gym lead blocks for gym_lead_blocks.ipynb. A block is a session's
+# climbs written down as grades, with notes in brackets:
+#   '11c'       sent
+#   '11c(f)'    fell
+#   '12b(TR)'   top roped
+#   '11c(TRf)'  top roped and fell
+# Grades are looked up in the same table as Pyramid uses
+# (climbing_project_api/assets/grade_tables.json) so '10' is 10.4, '11a/b'
+# is 11.2 and so on, anything not on it ('?', a route name) has no grade.
+#
+# A log is a DataFrame with one row per session and one column per climb
+# (shorter sessions padded with None). Every cell is parsed at once and the
+# stats come from one 2-D array, however many years of sessions there are.
+
+import re
+import warnings
+import numpy as np
+import pandas as pd
+from climbing_project_api.assets.grades import rope_values
+
+# grade, then anything in brackets
+_ANNOTATED = re.compile(r'^\s*(?P<grade>[^(]*?)\s*(?:\((?P<note>[^)]*)\))?\s*$')
+
+
+
+# parse_grades splits annotated grades into
+#   grade:   number from the grade table (NaN if it isn't on it)
+#   fell:    True for (f), (TRf)
+#   toprope: True for (TR), (TRf)
+# climbs: anything list like of strings (None/NaN for no climb)
+# A log only has a few dozen distinct entries, so only those are parsed
+def parse_grades(climbs):
+    climbs = pd.Series(climbs)
+    codes, uniques = pd.factorize(climbs)
+    uniques = pd.Series(np.append(uniques.astype(str), '')) # code -1 (no climb) -> ''
+    parts = uniques.str.extract(_ANNOTATED)
+    note = parts.note.fillna('')
+    grade = rope_values('5.' + parts.grade.fillna(''))
+    fell = note.str.contains('f').to_numpy()
+    toprope = note.str.contains('TR').to_numpy()
+    return pd.DataFrame({'grade': grade[codes], 'fell': fell[codes], 'toprope': toprope[codes]},
+                        index=climbs.index)
+
+
+
+# top_mean returns the mean of the n highest numbers in each row of grades
+# (a 2-D array, NaN for nothing there), of fewer if a row doesn't have n
+def top_mean(grades, n):
+    n = min(n, grades.shape[1])
+    if n == 0:
+        return np.full(grades.shape[0], np.nan)
+    top = np.partition(np.where(np.isnan(grades), -np.inf, grades), -n, axis=1)[:, -n:]
+    found = np.isfinite(top)
+    with np.errstate(invalid='ignore'): # rows with nothing in them are NaN
+        return np.where(found, top, 0).sum(axis=1) / found.sum(axis=1)
+
+
+
+# score_blocks returns the grades of the sends in log (falls and top ropes
+# are NaN) with avg, peak and top<n> of each session (rounded to 0.1)
+# log: DataFrame of annotated grades, one row per session
+def score_blocks(log, top=3):
+    climbs = parse_grades(log.to_numpy(dtype=object).ravel())
+    sends = np.where(climbs.fell | climbs.toprope, np.nan, climbs.grade).reshape(log.shape)
+    scores = pd.DataFrame(sends, index=log.index, columns=log.columns)
+    with warnings.catch_warnings(): # sessions without a send are NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        scores['avg'] = np.round(np.nanmean(sends, axis=1), 1)
+        scores['peak'] = np.nanmax(sends, axis=1)
+    scores[f'top{top}'] = np.round(top_mean(sends, top), 1)
+    return scores
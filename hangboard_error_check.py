@@ -1,40 +1,82 @@
-import datetime as dt
-import pandas as pd
-import numpy as np
+#!/usr/bin/env python3
+
+# Checks hangboard workbooks for entries that don't add up (successful +
+# failed rounds should be the number of rounds, for each hand of one handed
+# hangs too) and entries that can't be read at all.
+#
+#   python3 hangboard_error_check.py TrevorHB_kg.xlsx
+#   python3 hangboard_error_check.py logs/ 'team/*HB_*.xlsx' --report mistakes.json
+#   python3 hangboard_error_check.py logs/ --rounds 6 --report mistakes.csv
+#
+# Workbooks can be files, folders or glob patterns and are checked in
+# parallel. Without --rounds each workbook is checked against the number of
+# rounds it usually has (6 for repeaters, 2 for max hangs). Exits with 1 if
+# anything was found, so it can run from cron.
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
 import sys
+import pandas as pd
+from climbing_project_api.assets.hangboard import workbook_paths, read_workbook, find_mistakes
+
+REPORT_COLUMNS = ['workbook', 'date', 'grip', 'hand', 'cell', 'problem']
+
+
+
+# check_workbook returns the mistakes in one workbook (run in the worker processes)
+def check_workbook(path, rounds=None):
+    try:
+        mistakes = find_mistakes(read_workbook(path), rounds)
+    except Exception as e:
+        error = pd.DataFrame([{'workbook': path, 'problem': f'could not read workbook ({e!r})'}], columns=REPORT_COLUMNS)
+        return error.assign(date=pd.NaT) # a datetime column like the other reports, so they concat as dates
+    return mistakes.assign(workbook=path)[REPORT_COLUMNS]
 
-doc = sys.argv[1]
-
-df = pd.read_excel(doc)
-df.date = pd.to_datetime(df.date)
-df.date = pd.to_datetime(df.date, format='%d %b %Y')
-df = df.set_index('date')
-
-def error_check(entry, expected=6): # expected is number of total rounds
-    def check_element(elem):
-      entry_list = list(map(float,elem.split(',')))
-      success = entry_list[1]
-      fail = len(entry_list) - 2
-      total = success + fail
-      if total != expected:
-          return True
-      return False
-    if ':' in entry:
-        left,right = entry.split(':')
-        left_res = check_element(left[2:])
-        right_res = check_element(right[2:])
-        return left_res or right_res
+
+
+def check_workbooks(paths, rounds=None, workers=None):
+    with ProcessPoolExecutor(workers) as pool:
+        reports = list(pool.map(check_workbook, paths, [rounds] * len(paths)))
+    if not reports:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(reports, ignore_index=True)
+
+
+
+def write_report(report, path):
+    if path.endswith('.csv'):
+        report.to_csv(path, index=False, date_format='%Y-%m-%d')
     else:
-      check_element(entry)
+        records = report.assign(date=pd.to_datetime(report.date).dt.strftime('%Y-%m-%d')).astype(object)
+        records = records.where(records.notna(), None).to_dict(orient='records')
+        with open(path, 'w') as f:
+            json.dump(records, f, indent=2)
+
 
-problems = df.applymap(lambda x: error_check(x,6))
-indices = problems.index.to_list()
-locations = [(indices[x], problems.columns[y]) for x,y in zip(*np.where(problems.values == True))] # get "coordinates" i.e. row, column where "True" exists
 
-if locations:
-    print('Mistakes-- check these:')
-    for date, hold in locations:
-        print(f'{date.to_pydatetime().strftime("%d%b%Y")} : {hold}')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check hangboard workbooks for mistakes')
+    parser.add_argument('workbooks', nargs='+', help='workbooks, folders of workbooks or glob patterns')
+    parser.add_argument('--rounds', type=int, help='rounds per hang (default: what each workbook usually has)')
+    parser.add_argument('--report', help='also write the mistakes to a .json or .csv file')
+    parser.add_argument('--workers', type=int, help='processes to use (default: one per cpu)')
+    args = parser.parse_args()
 
-else:
-    print('No errors found')
+    paths = workbook_paths(args.workbooks)
+    report = check_workbooks(paths, args.rounds, args.workers)
+    if args.report:
+        write_report(report, args.report)
+
+    if len(report):
+        print('Mistakes-- check these:')
+        for workbook, mistakes in report.groupby('workbook', sort=False):
+            if len(paths) > 1:
+                print(workbook)
+            for row in mistakes.itertuples():
+                date = row.date.strftime("%d%b%Y") if pd.notna(row.date) else '?'
+                hand = '' if row.hand in ('both', None) or pd.isna(row.hand) else f' ({row.hand})'
+                print(f'{date} : {row.grip}{hand}  {row.cell}  [{row.problem}]')
+        sys.exit(1)
+    else:
+        print('No errors found')
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# A grid index over crawled routes (the table from Crawler.route_details:
+# route, location, longitude, latitude), for cutting trip sized gpx files out
+# of a big crawl without crawling again:
+#
+#   python3 route_index.py <routes.csv> near <lat> <lon> <km> <out.gpx|.kml>
+#   python3 route_index.py <routes.csv> box <south> <west> <north> <east> <out.gpx|.kml>
+#
+# gpsgrabber.py saves <name>.routes.csv next to every gpx it makes.
+#
+# Routes are sorted by the grid cell they're in (cells are `cell` degrees
+# on a side), so a query only looks at the rows of the cells it overlaps,
+# one searchsorted per row of cells, and checks the exact distance/box on
+# those alone.
+
+import sys
+import numpy as np
+import pandas as pd
+from gpx_writer import WRITERS, waypoint_table
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 2 * np.pi * EARTH_RADIUS_KM / 360
+_COLUMNS = 1 << 20  # cells per row of the grid, plenty for any cell size
+
+
+
+# haversine_km returns the distance from (lat, lon) to each of lats/lons
+def haversine_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2)**2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2)**2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+
+class RouteIndex:
+    # routes: DataFrame with at least latitude and longitude, routes without
+    #         coordinates are left out
+    # cell:   size of the grid cells in degrees (0.05 is about 5 km)
+    def __init__(self, routes, cell=0.05):
+        routes = routes[routes.latitude.notna() & routes.longitude.notna()]
+        self.cell = cell
+        keys = self._keys(routes.latitude.to_numpy(), routes.longitude.to_numpy())
+        order = np.argsort(keys, kind='stable')
+        self.routes = routes.iloc[order]
+        self.keys = keys[order]
+        self.lats = self.routes.latitude.to_numpy()
+        self.lons = self.routes.longitude.to_numpy()
+
+    def _row_col(self, lats, lons):
+        rows = np.floor((np.asarray(lats) + 90) / self.cell).astype(np.int64)
+        cols = np.floor((np.asarray(lons) + 180) / self.cell).astype(np.int64)
+        return rows, cols
+
+    def _keys(self, lats, lons):
+        rows, cols = self._row_col(lats, lons)
+        return rows * _COLUMNS + cols
+
+    # _candidates returns the positions of every route in the cells the box touches
+    def _candidates(self, south, west, north, east):
+        (row0, row1), (col0, col1) = self._row_col([south, north], [west, east])
+        rows = np.arange(row0, row1 + 1) * _COLUMNS
+        starts = np.searchsorted(self.keys, rows + col0, side='left')
+        ends = np.searchsorted(self.keys, rows + col1, side='right')
+        if not len(starts):
+            return np.array([], dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    # in_box returns the routes inside the box (edges included)
+    def in_box(self, south, west, north, east):
+        hits = self._candidates(south, west, north, east)
+        lats, lons = self.lats[hits], self.lons[hits]
+        inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+        return self.routes.iloc[hits[inside]]
+
+    # within returns the routes no more than km from (lat, lon), closest
+    # first, with their distance in a 'km' column
+    def within(self, lat, lon, km):
+        dlat = km / KM_PER_DEGREE
+        # the circle is widest nearer the pole than its centre, so the exact
+        # spherical bound (km / cos(lat) misses routes at the edge far north)
+        spread = np.sin(km / EARTH_RADIUS_KM) / max(np.cos(np.radians(lat)), 1e-12)
+        if abs(lat) + dlat >= 90 or spread >= 1:  # takes in a pole, every longitude
+            dlon = 180
+        else:
+            dlon = np.degrees(np.arcsin(spread))
+        hits = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        distance = haversine_km(lat, lon, self.lats[hits], self.lons[hits])
+        close = distance <= km
+        routes = self.routes.iloc[hits[close]].assign(km=distance[close])
+        return routes.sort_values('km', kind='stable')
+
+    # walls_within is within() as a waypoint table (one row per wall, see
+    # gpx_writer.waypoint_table), closest wall first
+    def walls_within(self, lat, lon, km):
+        return waypoint_table(self.within(lat, lon, km))
+
+    # save writes the routes (already in grid order) to a csv, load reads them back
+    def save(self, path):
+        self.routes.to_csv(path)
+
+    @classmethod
+    def load(cls, path, cell=0.05):
+        return cls(pd.read_csv(path, index_col='id', dtype={'id': str}), cell)
+
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if len(args) == 6 and args[1] == 'near':
+        index = RouteIndex.load(args[0])
+        walls = index.walls_within(float(args[2]), float(args[3]), float(args[4]))
+    elif len(args) == 7 and args[1] == 'box':
+        index = RouteIndex.load(args[0])
+        walls = waypoint_table(index.in_box(*map(float, args[2:6])))
+    else:
+        print("usage: route_index.py <routes.csv> near <lat> <lon> <km> <out.gpx|.kml>")
+        print("       route_index.py <routes.csv> box <south> <west> <north> <east> <out.gpx|.kml>")
+        sys.exit(1)
+    out_filename = args[-1]
+    count = WRITERS[out_filename.rsplit('.', 1)[-1]](out_filename, walls.itertuples(index=False))
+    print("A file has been created:",out_filename,f"({count} walls)")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the scripts and climbing_project_api are imported from the top of the repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
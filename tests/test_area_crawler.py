@@ -0,0 +1,183 @@
+import threading
+import time
+import pytest
+from area_crawler import Crawler, MP_HOST, SnapshotHandler, serve_snapshot
+from crawl_cache import CrawlCheckpoint
+
+# area -> sub areas, walls have routes instead
+AREAS = {
+  'area/1/root': ['area/2/north', 'area/3/south', 'area/4/east'],
+  'area/2/north': ['area/5/north-wall', 'area/6/north-cave'],
+  'area/3/south': ['area/7/south-wall', 'area/5/north-wall'], # linked twice, visited once
+  'area/4/east': ['area/8/east-slab', 'area/9/east-tower', 'area/10/east-blank'],
+  }
+ROUTES = {
+  'area/5/north-wall': ['route/101/arete', 'route/102/crack'],
+  'area/6/north-cave': ['route/103/roof'],
+  'area/7/south-wall': ['route/104/slab', 'route/105/dihedral', 'route/106/chimney'],
+  'area/8/east-slab': ['route/107/friction'],
+  'area/9/east-tower': ['route/108/summit', 'route/109/ridge'],
+  'area/10/east-blank': [],
+  }
+
+
+def area_page(links):
+  rows = ''.join(f'<div class="lef-nav-row"><a href="{MP_HOST}/{link}">{link}</a></div>' for link in links)
+  return f'<html><body>{rows}</body></html>'
+
+
+def wall_page(routes):
+  rows = ''.join(f'<tr><td><a href="{MP_HOST}/{route}">{route}</a></td></tr>' for route in routes)
+  return f'<html><body><table id="left-nav-route-table">{rows}</table></body></html>'
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+  for path, links in AREAS.items():
+    (tmp_path / (path + '.html')).parent.mkdir(parents=True, exist_ok=True)
+    (tmp_path / (path + '.html')).write_text(area_page(links))
+  for path, routes in ROUTES.items():
+    (tmp_path / (path + '.html')).parent.mkdir(parents=True, exist_ok=True)
+    (tmp_path / (path + '.html')).write_text(wall_page(routes))
+  return tmp_path
+
+
+class Server:
+  """ the stand-in server, logging every request (time, path) and failing
+  the first `failures[path]` requests for a path with the given statuses """
+  def __init__(self, directory, failures=None):
+    self.log = []
+    self.failures = {path: list(statuses) for path, statuses in (failures or {}).items()}
+    lock = threading.Lock()
+    outer = self
+
+    class Handler(SnapshotHandler):
+      def do_GET(self):
+        path = self.path.strip('/')
+        with lock:
+          outer.log.append((time.monotonic(), path))
+          statuses = outer.failures.get(path)
+          status = statuses.pop(0) if statuses else None
+        if status:
+          self.send_error(status)
+        else:
+          super().do_GET()
+
+      def log_message(self, *args):
+        pass
+
+    self.server = serve_snapshot(str(directory))
+    self.server.RequestHandlerClass = lambda *args, **kwargs: Handler(*args, directory=str(directory), **kwargs)
+    self.url = f'http://localhost:{self.server.server_port}'
+
+  def paths(self):
+    return [path for _, path in self.log]
+
+  def close(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+
+def expected_links(url):
+  return {f'{url}/{route}' for routes in ROUTES.values() for route in routes}
+
+
+def test_breadth_first_crawl_finds_every_route_once(snapshot):
+  server = Server(snapshot)
+  try:
+    links = Crawler(rate=0, workers=4).crawl(server.url + '/area/1/root')
+  finally:
+    server.close()
+  assert sorted(links) == sorted(expected_links(server.url))
+  paths = server.paths()
+  assert sorted(paths) == sorted(list(AREAS) + list(ROUTES)) # every page fetched exactly once
+
+
+def test_areas_are_visited_breadth_first(snapshot):
+  # with one worker the order is exact (with more, a fast sub area's walls
+  # can go out while its neighbours are still being fetched)
+  server = Server(snapshot)
+  try:
+    Crawler(rate=0, workers=1).crawl(server.url + '/area/1/root')
+  finally:
+    server.close()
+  assert server.paths() == ['area/1/root', 'area/2/north', 'area/3/south', 'area/4/east',
+                            'area/5/north-wall', 'area/6/north-cave', 'area/7/south-wall',
+                            'area/8/east-slab', 'area/9/east-tower', 'area/10/east-blank']
+
+
+def test_requests_stay_under_the_rate_limit(snapshot):
+  rate = 10
+  server = Server(snapshot)
+  try:
+    Crawler(rate=rate, workers=8).crawl(server.url + '/area/1/root')
+  finally:
+    server.close()
+  times = sorted(t for t, _ in server.log)
+  # k requests always take at least (k-1)/rate seconds (a little slack for
+  # the time between the limiter letting a request go and the server seeing it)
+  for k in range(2, len(times) + 1):
+    for i in range(len(times) - k + 1):
+      assert times[i + k - 1] - times[i] >= (k - 1) / rate - 0.04
+
+
+def test_5xx_and_429_are_retried(snapshot):
+  failures = {'area/2/north': [503, 500], 'area/7/south-wall': [429]}
+  server = Server(snapshot, failures)
+  try:
+    links = Crawler(rate=0, workers=4, backoff=0.01).crawl(server.url + '/area/1/root')
+  finally:
+    server.close()
+  assert sorted(links) == sorted(expected_links(server.url))
+  assert server.paths().count('area/2/north') == 3
+  assert server.paths().count('area/7/south-wall') == 2
+
+
+def test_resume_skips_pages_already_fetched(snapshot, tmp_path):
+  server = Server(snapshot)
+  start = server.url + '/area/1/root'
+  checkpoint_path = str(tmp_path / 'crawl.json')
+  try:
+    # stop partway through (as if it crashed), the checkpoint is saved after every page
+    first = []
+    crawl = Crawler(rate=0, workers=1).iter_route_links(start, CrawlCheckpoint(checkpoint_path), checkpoint_every=1)
+    for link in crawl:
+      first.append(link)
+      if len(first) == 3:
+        break
+    crawl.close()
+    state = CrawlCheckpoint(checkpoint_path).load(start)
+    done = set(state['seen']) - set(state['pending'])
+    done = {url[len(server.url) + 1:] for url in done}
+    assert done
+
+    fetched_before = len(server.log)
+    links = Crawler(rate=0, workers=1).crawl(start, CrawlCheckpoint(checkpoint_path), checkpoint_every=1)
+    resumed = server.paths()[fetched_before:]
+  finally:
+    server.close()
+  assert sorted(links) == sorted(expected_links(server.url))
+  assert not done & set(resumed)
+  assert sorted(set(resumed) | done) == sorted(list(AREAS) + list(ROUTES))
+
+
+def test_checkpoint_saves_only_append(tmp_path):
+  path = str(tmp_path / 'crawl.json')
+  checkpoint = CrawlCheckpoint(path)
+  checkpoint.save('root', ['root', 'a', 'b'], ['root'], ['r1'])
+  first = open(path + '.areas').read()
+  checkpoint.save('root', ['c'], ['a'], ['r2', 'r3'])
+  assert open(path + '.areas').read().startswith(first) # earlier areas aren't written again
+  assert len(open(path).read()) < 100 # just the counts, however big the crawl
+
+  # a save that died after appending is dropped on load
+  with open(path + '.areas', 'a') as f:
+    f.write('-b\n+d\n')
+  with open(path + '.routes', 'a') as f:
+    f.write('r4\n')
+  resumed = CrawlCheckpoint(path)
+  state = resumed.load('root')
+  assert state['seen'] == ['root', 'a', 'b', 'c']
+  assert state['pending'] == ['b', 'c'] # in the order they were seen
+  assert list(resumed.route_links()) == ['r1', 'r2', 'r3']
+  assert CrawlCheckpoint(path).load('other') is None
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import requests
+import climber_scrape
+from climber_scrape import scrape_grades
+
+
+def test_grades_on_the_old_scale():
+  ratings = pd.Series(['5.7+', '5.8', '5.9 R', '5.10a', 'V-easy', 'V0', 'V1', 'V5', 'WI4', '3rd'])
+  grades = scrape_grades(ratings, pd.Series(['Sport'] * 6 + ['Boulder'] * 2 + ['Ice', 'Trad']))
+  np.testing.assert_array_equal(grades, [7.5, 8.5, 9.5, 10.0, 0, 0, 1.2, 5.2, np.nan, np.nan])
+
+
+def test_mixed_ratings_are_boulders_only_on_boulders():
+  ratings = pd.Series(['5.8 V0', '5.8 V0', '5.10a V1'])
+  grades = scrape_grades(ratings, pd.Series(['Boulder, TR', 'Boulder', 'Trad']))
+  np.testing.assert_array_equal(grades, [8.5, 0, 10.0])
+
+
+def test_a_failed_name_lookup_skips_only_that_name(monkeypatch):
+  downloads = []
+
+  def find_user_ids(crawler, name):
+    if name == 'broken':
+      raise requests.HTTPError('503 for search')
+    if name == 'garbled':
+      raise KeyError('results') # json without the expected keys
+    return {'ann': ['1', '2'], 'bob': ['3']}[name]
+
+  monkeypatch.setattr(climber_scrape, 'find_user_ids', find_user_ids)
+  monkeypatch.setattr(climber_scrape, '_download', lambda crawler, user_id, out: out.put((user_id, 'Date\n')))
+
+  class Collect:
+    def put(self, item):
+      downloads.append(item)
+
+  climber_scrape._download_all(None, ['ann', 'broken', 'garbled', 'bob'], Collect(), workers=2)
+  assert downloads[-1] is None
+  assert sorted(user_id for user_id, _ in downloads[:-1]) == ['1', '2', '3']
@@ -0,0 +1,41 @@
+import threading
+import climber_scrape
+from climber_scrape import StatsSink, scrape
+
+EXPORT = '''Date,Route,Rating,Notes,URL,Pitches,Location,Avg Stars,Your Stars,Style,Lead Style,Route Type,Your Rating,Length,Rating Code
+2020-05-01,Arete,5.10a,,x,1,California > Joshua Tree,3,-1,Lead,Redpoint,Sport,,80,1000
+2021-06-02,Crack,5.9 R,,x,2,California > Joshua Tree,3,-1,Lead,Onsight,Trad,,100,1000
+2022-07-03,Roof,V3,,x,1,California > Bishop,3,-1,Send,,Boulder,,15,1000
+'''
+
+
+class WatchedSink(StatsSink):
+  """ a StatsSink that says when it has written `wanted` batches """
+  def __init__(self, directory, wanted):
+    super().__init__(directory)
+    self.wanted = wanted
+    self.written = threading.Event()
+
+  def write(self, user_ids, stats):
+    super().write(user_ids, stats)
+    if len(self._parts()) >= self.wanted:
+      self.written.set()
+
+
+def test_finished_batches_are_written_while_downloads_continue(tmp_path, monkeypatch):
+  sink = WatchedSink(str(tmp_path / 'stats'), wanted=2)
+  seen_early = []
+
+  def fake_download_all(crawler, names, downloads, workers, skip=()):
+    # two batches, then wait for them to be on disk before sending the rest
+    for i in range(4):
+      downloads.put((str(i), EXPORT))
+    seen_early.append(sink.written.wait(timeout=30))
+    for i in range(4, 6):
+      downloads.put((str(i), EXPORT))
+    downloads.put(None)
+
+  monkeypatch.setattr(climber_scrape, '_download_all', fake_download_all)
+  stats = scrape(['anyone'], stat_workers=2, batch_size=2, sink=sink)
+  assert seen_early == [True]
+  assert sorted(stats.index) == [str(i) for i in range(6)]
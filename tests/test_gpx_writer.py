@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from gpx_writer import waypoint_table, write_gpx
+
+
+def routes():
+  return pd.DataFrame({
+    'route': ['Arete', 'Crack', 'Roof', 'Slab', 'Ghost'],
+    'location': ['Area-North Wall', 'Area-North Wall', 'Area-Cave', 'Area-Cave', 'Area-Nowhere'],
+    'latitude': [np.nan, 36.10, 36.20, 36.21, np.nan],
+    'longitude': [-115.40, -115.41, np.nan, -115.42, np.nan],
+    })
+
+
+def test_positions_come_from_one_route():
+  walls = waypoint_table(routes())
+  # North Wall's first route has no latitude, Cave's first no longitude:
+  # both use their second route for lat and lon, never one from each
+  assert walls.to_dict('list') == {
+    'lat': [36.10, 36.21],
+    'lon': [-115.41, -115.42],
+    'name': ['North Wall', 'Cave'],
+    'desc': ['Arete   Crack', 'Roof   Slab'],
+    }
+
+
+def test_walls_without_coordinates_are_not_written(tmp_path):
+  path = str(tmp_path / 'walls.gpx')
+  assert write_gpx(path, waypoint_table(routes()).itertuples(index=False)) == 2
+  gpx = open(path).read()
+  assert 'nan' not in gpx
+  assert 'Nowhere' not in gpx
@@ -0,0 +1,70 @@
+from math import floor
+import numpy as np
+import pandas as pd
+from climbing_project_api.assets.grades import BOULDER_GRADES, boulder_convert, normalize_grades, ropes_convert
+
+
+# Pyramid's per-value versions, from before grades were worked out a column at a time
+def old_clean_grade(grade):
+  grade = str(grade).split()
+  try:
+    vgrade = [g for g in grade if g.startswith('V')][0]
+    grade = boulder_convert[vgrade]
+  except IndexError:
+    if grade[0][0] == '5':
+      grade = ropes_convert[grade[0]]
+  return grade
+
+
+def old_x_round(x):
+  if x >= 10:
+    return floor(x*4)/4
+  else:
+    base = floor(x)
+    return_map = {x - base : 0, abs(x - base -.4): .4, abs(x - base - .8): .8}
+    end = return_map[min(x-base, abs(x-base-.4), abs(x-base-.8))]
+    return float(base + end)
+
+
+def old_grade_to_letter(grade, boulder):
+  if boulder:
+    grade = str(floor(grade))
+    return 'V-easy' if grade == '-1' else 'V'+grade
+  letter_map = {'.0':'a', '.25':'b', '.5':'c', '.75':'d'}
+  letter_map_low = {'.0':'-', '.4':'', '.8':'+'}
+  grade = str(float(grade))
+  if float(grade) >= 10:
+    return grade[:2] + letter_map[grade[2:]]
+  return grade[:1] + letter_map_low[grade[1:]]
+
+
+RATINGS = (list(ropes_convert) + list(boulder_convert)
+           + ['5.10a R', '5.9 PG13', '5.8 V0', '5.8 V-easy', '5.11b V3-4', 'V5 R', 'V17'])
+
+
+def test_same_as_the_old_per_value_grades():
+  grades = normalize_grades(pd.Series(RATINGS))
+  for rating, row in zip(RATINGS, grades.itertuples()):
+    grade = old_clean_grade(rating)
+    boulder = 'V' in rating
+    if isinstance(grade, list): # '3rd', 'Easy 5th'... were dropped as strings later on
+      assert np.isnan(row.grade) and not isinstance(row.letter, str), rating
+      continue
+    assert row.grade == grade, rating
+    assert row.boulder == boulder, rating
+    assert row.bucket == old_x_round(grade), rating
+    assert row.letter == old_grade_to_letter(old_x_round(grade), boulder), rating
+
+
+def test_v17_is_on_the_chart():
+  # the old grade schema stopped at V16, so V17 ticks had nowhere to go
+  grades = normalize_grades(pd.Series(['V17', 'V17-', 'V16-17']))
+  assert grades.letter.tolist() == ['V17', 'V17', 'V16']
+  assert 'V17' in BOULDER_GRADES
+
+
+def test_anything_else_is_off_the_chart():
+  grades = normalize_grades(pd.Series(['WI4', 'A2', 'Easy Snow', np.nan]))
+  assert grades.grade.isna().all()
+  assert grades.letter.isna().all()
+  assert not grades.boulder.any()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from gym_blocks import parse_grades, score_blocks, top_mean
+
+# sessions from gym_lead_blocks.ipynb
+LOG = pd.DataFrame.from_dict({
+  '13Sep2023': ['10a', '10c', '11b', '10d', '11b', '11a', '11b(f)', '11a(f)', '10a'],
+  '26Sep2023': ['10a', '10c', '11a/b', '11a/b', '10b', '10b', '12b', '11c(f)', '10a'],
+  '1Oct2023': ['10b', '10c', '10a', '10a', '12a', '10c', '10a', '11d(f)', '10'],
+  '10Nov2023': ['10b', '11d(TR)', '12b(TR)', '12b', '11a', '11a(f)', '11b', '10c', '11b(f)'],
+  '7Dec2023': ['10a', '10b', '10d', '11b', '11a', '10d(f)', '11b(TR)', '11a(TR)', '11c(TRf)'],
+  '16Jan2024': ['10b', '10c', '10d', '11d', '11a(f)', '10c', '12b(TR)', '10d(TR)', 'offhandcrack (TR)'],
+  '31Aug2025': ['9', '10a', '10a', '10b', '10b', '10c', '10c', '10c', '10c'],
+  '1Sep2025': ['10b', '10b', '10c', '?', '?', '?', '10c', '10b', '11b(TR)'],
+  '26Sep2025': ['10c', '10+', '11a', '11c', '11a', '10c', '11b', '12a', '11d(TR)'],
+  'all falls': ['11a(f)', '11b(f)', '12a(TR)', None, None, None, None, None, None],
+  }, orient='index')
+
+# the notebook's own table and cell by cell scoring, from before gym_blocks.py
+OLD_ROPES = {'5': 5,'6': 6,'7': 7,'7+': 7.4,'8-': 8,'8': 8.4,'8+': 8.8,'9-': 9,'9': 9.4,'9+': 9.8,
+             '10a': 10.0, '10-': 10.1, '10a/b': 10.2, '10b': 10.3, '10': 10.4, '10b/c': 10.5, '10c': 10.6, '10+': 10.7, '10c/d': 10.8, '10d': 10.9,
+             '11a': 11.0, '11-': 11.1, '11a/b': 11.2, '11b': 11.3, '11': 11.4, '11b/c': 11.5, '11c': 11.6, '11+': 11.7, '11c/d': 11.8, '11d': 11.9,
+             '12a': 12.0, '12-': 12.1, '12a/b': 12.2, '12b': 12.3, '12': 12.4, '12b/c': 12.5, '12c': 12.6, '12+': 12.7, '12c/d': 12.8, '12d': 12.9}
+
+
+def old_scores(log):
+  sends = log.apply(lambda col: col.map(lambda val: None if not isinstance(val, str) or '(' in val else OLD_ROPES.get(val)))
+  sends = sends.astype(float)
+  return pd.DataFrame({
+    'avg': round(sends.mean(axis=1), 1),
+    'peak': sends.max(axis=1),
+    'top3': sends.apply(lambda row: round(row.nlargest(3).mean(), 1), axis=1),
+    })
+
+
+def test_scores_match_the_notebook():
+  scores = score_blocks(LOG)
+  pd.testing.assert_frame_equal(scores[['avg', 'peak', 'top3']], old_scores(LOG), check_column_type=False)
+  assert scores.loc['all falls', ['avg', 'peak', 'top3']].isna().all()
+
+
+def test_notes_are_parsed():
+  climbs = parse_grades(['11c', '11c(f)', '12b(TR)', '11c(TRf)', ' 10a/b ', '?', None])
+  np.testing.assert_array_equal(climbs.grade, [11.6, 11.6, 12.3, 11.6, 10.2, np.nan, np.nan])
+  assert climbs.fell.tolist() == [False, True, False, True, False, False, False]
+  assert climbs.toprope.tolist() == [False, False, True, True, False, False, False]
+
+
+def test_top_mean_with_fewer_than_n():
+  grades = np.array([[10.0, np.nan, 12.0, 11.0], [np.nan, 9.4, np.nan, np.nan], [np.nan] * 4])
+  with np.errstate(invalid='ignore'):
+    np.testing.assert_array_equal(top_mean(grades, 3), [11.0, 9.4, np.nan])
+  np.testing.assert_array_equal(top_mean(grades, 1), [12.0, 9.4, np.nan])
@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+from climbing_project_api.assets import hangboard
+
+
+def make_workbook(path):
+  pd.DataFrame({
+    'date': ['1 Jan 2024', '3 Jan 2024'],
+    'jug': ['5,6', '5,4,7'],
+    'sloper': ['R,0,6:L,0,5,8', '0,6'],
+    }).to_excel(path, index=False)
+
+
+def test_cache_is_feather_and_used_until_the_workbook_changes(tmp_path, monkeypatch):
+  path = str(tmp_path / 'TestHB_kg.xlsx')
+  make_workbook(path)
+  parsed = hangboard.read_workbook(path)
+  cache_path = str(tmp_path / '.TestHB_kg.xlsx.sessions.feather')
+  assert os.path.exists(cache_path)
+
+  parse = hangboard.parse_workbook
+  monkeypatch.setattr(hangboard, 'parse_workbook', lambda p: 1 / 0) # a cache hit doesn't parse
+  pd.testing.assert_frame_equal(hangboard.read_workbook(path), parsed)
+
+  monkeypatch.setattr(hangboard, 'parse_workbook', parse)
+  os.utime(path, ns=(1, 1)) # changed -> parsed again
+  pd.testing.assert_frame_equal(hangboard.read_workbook(path), parsed)
+
+
+def test_a_bad_cache_file_is_ignored(tmp_path):
+  path = str(tmp_path / 'TestHB_kg.xlsx')
+  make_workbook(path)
+  with open(str(tmp_path / '.TestHB_kg.xlsx.sessions.feather'), 'wb') as f:
+    f.write(b'\x80\x04not feather at all')
+  assert len(hangboard.read_workbook(path)) == 5
+
+
+def test_fail_times_are_kept_per_round(tmp_path):
+  path = str(tmp_path / 'TestHB_kg.xlsx')
+  make_workbook(path)
+  sessions = hangboard.read_workbook(path)
+  sessions = hangboard.read_workbook(path) # and through the cache
+  times = {(row.grip, row.hand, row.date.day): list(row.fail_times) for row in sessions.itertuples()}
+  assert times == {('jug', 'both', 1): [], ('jug', 'both', 3): [7.0],
+                   ('sloper', 'R', 1): [], ('sloper', 'L', 1): [8.0], ('sloper', 'both', 3): []}
+
+  reps = hangboard.session_reps(sessions, hangtime=10)
+  sloper_left = reps[(reps.grip == 'sloper') & (reps.hand == 'L')]
+  assert sloper_left.rep.tolist() == [1, 2, 3, 4, 5, 6]
+  assert sloper_left.success.tolist() == [True] * 5 + [False]
+  assert sloper_left.seconds.tolist() == [10.0] * 5 + [8.0]
+  jug = reps[(reps.grip == 'jug') & (reps.date.dt.day == 3)]
+  assert jug.seconds.tolist() == [10.0] * 4 + [7.0]
+  assert len(reps) == int((sessions.success + sessions.fail).sum())
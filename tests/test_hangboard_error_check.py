@@ -0,0 +1,25 @@
+import json
+import pandas as pd
+from hangboard_error_check import check_workbooks, write_report
+
+
+def test_json_report_with_an_unreadable_workbook(tmp_path):
+  good = tmp_path / 'TestHB_lb.xlsx'
+  pd.DataFrame({
+    'date': ['1 Jan 2024', '3 Jan 2024'],
+    'jug': ['5,6', '5,4,7'],        # second one is 5 rounds, not 6
+    'sloper': ['0,6', '0,6'],
+    }).to_excel(good, index=False)
+  broken = tmp_path / 'BrokenHB_lb.xlsx'
+  broken.write_bytes(b'not a workbook')
+
+  report = check_workbooks([str(good), str(broken)], rounds=6, workers=2)
+  path = tmp_path / 'mistakes.json'
+  write_report(report, str(path))
+
+  records = json.loads(path.read_text())
+  by_workbook = {r['workbook']: r for r in records}
+  assert by_workbook[str(good)]['date'] == '2024-01-03'
+  assert by_workbook[str(good)]['problem'] == 'rounds != 6'
+  assert by_workbook[str(broken)]['date'] is None
+  assert by_workbook[str(broken)]['problem'].startswith('could not read workbook')
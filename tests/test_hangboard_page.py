@@ -0,0 +1,61 @@
+import os
+import sys
+import dash
+import pandas as pd
+import pytest
+from dash.exceptions import PreventUpdate
+
+# the dash pages import `app` and `assets` from inside climbing_project_api
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'climbing_project_api'))
+from pages import hangboard as page
+
+update_progress = page.update_progress.__wrapped__
+
+
+def write_workbook(path, rows):
+  pd.DataFrame(rows, columns=['date', 'jug', 'sloper']).to_excel(path, index=False)
+
+
+@pytest.fixture
+def workbooks(tmp_path, monkeypatch):
+  monkeypatch.setattr(page.hangboard_cache, 'patterns', [str(tmp_path)])
+  page.hangboard_cache.clear()
+  yield tmp_path
+  page.hangboard_cache.clear()
+
+
+def test_unknown_paths_are_ignored(workbooks, tmp_path_factory):
+  other = tmp_path_factory.mktemp('elsewhere')
+  outside = str(other / 'OtherHB_lb.xlsx')
+  write_workbook(outside, [['1 Jan 2024', '5,6', '0,6']])
+  for path in [outside, '/etc/passwd', 'https://example.com/x.xlsx']:
+    with pytest.raises(PreventUpdate):
+      update_progress(0, path, 'both', 'lb', None)
+  assert page.hangboard_cache._workbooks == {}
+  assert os.listdir(str(other)) == ['OtherHB_lb.xlsx'] # no cache written next to it
+
+
+def test_new_sessions_are_sent_as_extend_data(workbooks):
+  path = os.path.normpath(str(workbooks / 'TestHB_lb.xlsx'))
+  rows = [['1 Jan 2024', '5,6', '0,6'], ['3 Jan 2024', '5,5,8', '-5,6']]
+  write_workbook(path, rows)
+  fig, extend, shown = update_progress(0, path, 'both', 'lb', None)
+  assert extend is dash.no_update
+  assert [len(trace.x) for trace in fig.data] == [2, 2]
+
+  with pytest.raises(PreventUpdate): # nothing changed
+    update_progress(1, path, 'both', 'lb', shown)
+
+  write_workbook(path, rows + [['5 Jan 2024', '10,6', None]])
+  fig2, extend, shown2 = update_progress(2, path, 'both', 'lb', shown)
+  assert fig2 is dash.no_update
+  data, traces = extend
+  assert traces == [shown['series'].index('jug')]
+  assert data == {'x': [['2024-01-05']], 'y': [[10.0]]}
+  assert shown2['rows'] == shown['rows'] + 1
+
+  # an edited entry that's already on the figure means building it again
+  write_workbook(path, [['1 Jan 2024', '6,6', '0,6']] + rows[1:] + [['5 Jan 2024', '10,6', None]])
+  fig3, extend, shown3 = update_progress(3, path, 'both', 'lb', shown2)
+  assert extend is dash.no_update and fig3 is not dash.no_update
+  assert shown3['version'] == shown2['version'] + 1
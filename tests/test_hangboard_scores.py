@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from climbing_project_api.assets import hangboard
+
+HANGTIME, ROUNDS = 10, 6
+
+
+def old_hang(cell, rounds, whole_column_sent, to_lb=False):
+  # the notebook's process_hangboard_for_plot, for one two handed cell
+  values = cell.split(',')
+  weight = float(values[0])
+  if to_lb:
+    weight = round(weight*2.2046, 1)
+  if whole_column_sent: # a column with no fail times anywhere was taken as every round sent
+    tut, penalty = HANGTIME*rounds, 0
+  else:
+    success = float(values[1])
+    tut = HANGTIME*success + sum(float(v) for v in values[2:])
+    penalty = np.log(rounds + 1 - success)/np.log(6)
+  return weight - 2.5*penalty - 2.5*(1 - tut/(HANGTIME*rounds))
+
+
+def write_workbook(path, columns):
+  dates = ['1 Jan 2024', '8 Jan 2024', '15 Jan 2024', '22 Jan 2024']
+  pd.DataFrame(dict(date=dates, **columns)).to_excel(path, index=False)
+
+
+@pytest.mark.parametrize('name, unit, to_lb', [('TestHB_lb.xlsx', 'lb', False), ('TestHB_kg.xlsx', 'lb', True)])
+def test_effective_weight_matches_the_notebook(tmp_path, name, unit, to_lb):
+  columns = {
+    'jug': ['20,6', '25,5,7', '30,4,3,9', '35,2,1,2,5,8'],
+    'crimp': ['0,6', '5,6', '7.5,6', '10,6'],
+    }
+  path = str(tmp_path / name)
+  write_workbook(path, columns)
+  scored = hangboard.score_sessions(hangboard.read_workbook(path, cache=False), HANGTIME, ROUNDS, unit)
+  for grip, cells in columns.items():
+    whole_column_sent = all(len(cell.split(',')) == 2 for cell in cells)
+    expected = [old_hang(cell, ROUNDS, whole_column_sent, to_lb) for cell in cells]
+    got = scored[scored.grip == grip].sort_values('date').effective_weight.tolist()
+    np.testing.assert_allclose(got, expected, err_msg=grip)
+
+
+def test_one_handed_cells_keep_their_own_hand(tmp_path):
+  path = str(tmp_path / 'TestHB_lb.xlsx')
+  write_workbook(path, {'edge': ['L,0,6:R,5,5,8', 'R,5,6:L,0,4,2,3', None, None]})
+  scored = hangboard.score_sessions(hangboard.read_workbook(path, cache=False), HANGTIME, ROUNDS, 'lb')
+  by_series = scored.set_index(['date', 'series']).effective_weight
+  assert by_series[(pd.Timestamp('2024-01-01'), 'edge_L')] == 0
+  np.testing.assert_allclose(by_series[(pd.Timestamp('2024-01-01'), 'edge_R')], old_hang('5,5,8', ROUNDS, False))
+  assert by_series[(pd.Timestamp('2024-01-08'), 'edge_R')] == 5
+  np.testing.assert_allclose(by_series[(pd.Timestamp('2024-01-08'), 'edge_L')], old_hang('0,4,2,3', ROUNDS, False))
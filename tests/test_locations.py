@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from climbing_project_api.assets.locations import LocationTrie
+
+LOCATIONS = [
+  'California > Joshua Tree National Park > Real Hidden Valley',
+  'California > Joshua Tree National Park > Hidden Valley Campground',
+  'California > Joshua Tree National Park',
+  'California > Yosemite National Park > Yosemite Valley > El Capitan',
+  'California > Yosemite National Park > Tuolumne Meadows',
+  'Nevada > Red Rock > Calico Basin',
+  'Nevada > Red Rock > Calico Basin > Kraft Boulders',
+  'Nevada > Red Rock',
+  'Nevada > Hidden Valley', # same name as an area in California
+  ]
+SUB_LOCATIONS = [
+  ['California'], ['Nevada'], ['California', 'Joshua Tree National Park'],
+  ['Nevada', 'Red Rock', 'Calico Basin'], ['Nevada', 'Hidden Valley'],
+  ['California', 'Yosemite National Park', 'Yosemite Valley', 'El Capitan'],
+  ['Red Rock'], ['Calico Basin', 'Nevada'], ['Hidden Valley'], ['Utah'], ['California', 'Red Rock'],
+  ]
+
+
+def old_filter(locations, sub_location):
+  # what Pyramid did per row before the range mask
+  return locations.str.split(' > ').apply(lambda x: all(item in x for item in sub_location)).to_numpy()
+
+
+def test_mask_matches_the_per_row_filter():
+  rng = np.random.RandomState(0)
+  locations = pd.Series(rng.choice(LOCATIONS, 5000))
+  tree = LocationTrie(locations.unique())
+  ids = tree.path_ids(locations)
+  for sub_location in SUB_LOCATIONS:
+    np.testing.assert_array_equal(tree.mask(ids, sub_location), old_filter(locations, sub_location), str(sub_location))
+
+
+def test_blank_locations_match_nothing():
+  locations = pd.Series([LOCATIONS[0], np.nan, LOCATIONS[5]])
+  tree = LocationTrie(locations.unique())
+  ids = tree.path_ids(locations)
+  assert ids[1] == -1
+  assert tree.mask(ids, ['California']).tolist() == [True, False, False]
+  assert tree.mask(ids, ['Calico Basin']).tolist() == [False, False, True]
@@ -0,0 +1,39 @@
+import pandas as pd
+from climbing_project_api.assets.pyramid_class import Ticks
+
+URL = 'https://www.mountainproject.com/user/1234567/first-last/tick-export'
+
+
+def make_ticks(dates, lengths, pitches):
+  n = len(dates)
+  raw = pd.DataFrame({
+    'Date': pd.to_datetime(dates),
+    'Route': ['Route ' + str(i) for i in range(n)],
+    'Rating': ['5.10a'] * n,
+    'Style': ['Lead'] * n,
+    'Lead Style': ['Redpoint'] * n,
+    'Route Type': ['Sport'] * n,
+    'Location': ['Nevada > Red Rock'] * n,
+    'Length': lengths,
+    'Pitches': pitches,
+    })
+  return Ticks(URL, raw=raw)
+
+
+def test_jan_1_counts_once():
+  # the old yearly bounds ran from Jan 1 to Jan 1 inclusive, so a Jan 1 tick counted in two years
+  ticks = make_ticks(['2018-06-01', '2018-12-31', '2019-01-01', '2019-07-04', '2020-01-01'],
+                     [5280, 2640, 10560, 5280, 1320], [1, 2, 3, 1, 1])
+  miles = ticks.mileage('year')
+  assert miles.index.astype(str).tolist() == ['2018', '2019', '2020']
+  assert miles.tolist() == [1.5, 3.0, 0.25]
+  assert miles.sum() == 4.75 # every foot once
+  assert ticks.pitches('year').tolist() == [3, 4, 1]
+
+
+def test_months_and_weeks_add_up_to_years():
+  ticks = make_ticks(['2019-01-01', '2019-01-06', '2019-01-07', '2019-02-28', '2019-03-01'],
+                     [100, 200, 300, 400, 500], [1, 1, 2, 1, 3])
+  assert ticks.mileage('month').round(6).tolist() == [round(600/5280, 3), round(400/5280, 3), round(500/5280, 3)]
+  assert ticks.pitches('week').tolist() == [2, 2, 4] # weeks end on sunday, feb 28 and mar 1 share one
+  assert ticks.pitches('month').sum() == ticks.pitches('year').sum() == 8
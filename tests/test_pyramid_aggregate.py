@@ -0,0 +1,45 @@
+from collections import Counter
+import pandas as pd
+from climbing_project_api.assets.pyramid_class import Ticks
+
+URL = 'https://www.mountainproject.com/user/1234567/first-last/tick-export'
+
+
+def make_ticks():
+  # 12 routes at 10a (route 0 sent 3 times), a few at each harder grade
+  ratings = ['5.10a'] * 14 + ['5.10b'] * 4 + ['5.10c'] * 3 + ['5.11a'] * 2 + ['5.11c']
+  routes = ['Route 0'] * 3 + ['Route ' + str(i) for i in range(1, 12)] + ['Route ' + str(i) for i in range(20, 30)]
+  n = len(ratings)
+  raw = pd.DataFrame({
+    'Date': pd.date_range('2020-01-01', periods=n, freq='D'),
+    'Route': routes,
+    'Rating': ratings,
+    'Style': ['Lead'] * n,
+    'Lead Style': ['Redpoint'] * n,
+    'Route Type': ['Sport'] * n,
+    'Location': ['Nevada > Red Rock'] * n,
+    'Length': 80,
+    'Pitches': 1,
+    })
+  return Ticks(URL, raw=raw)
+
+
+def test_one_bar_per_grade_with_the_same_counts():
+  pyramid = make_ticks().pyramid()
+  per_tick = pyramid.show_pyramids((['sport'], ['Redpoint']))
+  aggregated = pyramid.show_pyramids((['sport'], ['Redpoint']), aggregate=True, max_routes=5)
+  counts = Counter()
+  for grade, count in zip(per_tick.data[0].y, per_tick.data[0].x):
+    counts[grade] += count
+  assert list(aggregated.data[0].y) == ['11c', '11a', '10c', '10b', '10a'] # hardest first, like the per tick bars
+  assert dict(zip(aggregated.data[0].y, aggregated.data[0].x)) == dict(counts)
+  assert aggregated.layout.title.text == per_tick.layout.title.text
+
+
+def test_hover_lists_the_most_ticked_routes():
+  fig = make_ticks().pyramid().show_pyramids((['sport'], ['Redpoint']), aggregate=True, max_routes=5)
+  hover = dict(zip(fig.data[0].y, fig.data[0].hovertext))
+  lines = hover['10a'].split('<br>')
+  assert lines[0] == 'Route 0 x3'
+  assert len(lines) == 6 and lines[-1] == 'and 7 more' # 12 routes, 5 shown
+  assert hover['11c'] == 'Route 29'
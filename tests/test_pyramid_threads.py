@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from climbing_project_api.assets.pyramid_class import Ticks
+
+URL = 'https://www.mountainproject.com/user/1234567/first-last/tick-export'
+
+
+def make_ticks(n=300, seed=0):
+  rng = np.random.RandomState(seed)
+  ropes = ['5.9', '5.10a', '5.10b', '5.10c', '5.10d', '5.11a', '5.11b', '5.11c', '5.11d', '5.12a']
+  boulders = ['V0', 'V1', 'V2', 'V3', 'V4', 'V5', 'V6', 'V7']
+  route_type = rng.choice(['Sport', 'Trad', 'Boulder'], n)
+  rating = np.where(route_type == 'Boulder', rng.choice(boulders, n), rng.choice(ropes, n))
+  boulder = route_type == 'Boulder'
+  raw = pd.DataFrame({
+    'Date': pd.date_range('2015-01-01', periods=n, freq='3D'),
+    'Route': ['Route ' + str(i % 40) for i in range(n)],
+    'Rating': rating,
+    'Style': np.where(boulder, rng.choice(['Send', 'Flash'], n), 'Lead'),
+    'Lead Style': np.where(boulder, None, rng.choice(['Redpoint', 'Onsight', 'Flash'], n)),
+    'Route Type': route_type,
+    'Location': rng.choice(['Nevada > Red Rock > Calico Basin', 'California > Joshua Tree'], n),
+    'Length': 80,
+    'Pitches': 1,
+    })
+  return Ticks(URL, raw=raw)
+
+
+REQUESTS = [
+  (['sport'], ['Redpoint']),
+  (['trad'], ['Onsight', 'Flash']),
+  (['boulder'], ['Send', 'Flash']),
+  (['sport', 'trad'], ['Redpoint', 'Onsight']),
+  (['sport'], None),
+  ]
+
+
+def summary(fig):
+  return fig.layout.title.text, list(fig.data[0].y), list(fig.data[0].x)
+
+
+def test_show_pyramids_from_many_threads():
+  # every call gets back what it asked for, whatever else runs at the same time
+  expected = {}
+  for i, (styles, lead) in enumerate(REQUESTS):
+    expected[i] = summary(make_ticks().pyramid().show_pyramids((styles, lead), aggregate=True))
+
+  ticks = make_ticks() # one Pyramid shared by every thread, like the dash callbacks
+  calls = [i % len(REQUESTS) for i in range(200)]
+  with ThreadPoolExecutor(16) as pool:
+    figs = list(pool.map(lambda i: ticks.pyramid().show_pyramids(REQUESTS[i], aggregate=True), calls))
+  for i, fig in zip(calls, figs):
+    assert summary(fig) == expected[i]
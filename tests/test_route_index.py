@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from route_index import RouteIndex, haversine_km
+
+
+def make_routes(n, south, west, north, east, seed=0):
+  rng = np.random.RandomState(seed)
+  routes = pd.DataFrame({
+    'route': ['Route ' + str(i) for i in range(n)],
+    'location': ['Area-Wall ' + str(i % 50) for i in range(n)],
+    'latitude': rng.uniform(south, north, n),
+    'longitude': rng.uniform(west, east, n),
+    }, index=pd.Index([str(i) for i in range(n)], name='id'))
+  routes.iloc[::97, 2] = np.nan # some routes have no coordinates
+  return routes
+
+
+def index_ids(routes):
+  return sorted(routes.index)
+
+
+@pytest.mark.parametrize('south, west, north, east, cell', [
+  (35.5, -116.0, 36.5, -115.0, 0.05), # red rock sized
+  (-45.0, 168.0, -43.0, 171.0, 0.2),
+  (60.0, -151.0, 66.0, -140.0, 0.05), # far north, where a degree of longitude is short
+  ])
+def test_queries_match_brute_force(south, west, north, east, cell):
+  routes = make_routes(3000, south, west, north, east)
+  index = RouteIndex(routes, cell)
+  located = routes.dropna(subset=['latitude', 'longitude'])
+  rng = np.random.RandomState(1)
+  for _ in range(40):
+    lat, lon = rng.uniform(south, north), rng.uniform(west, east)
+    km = rng.choice([0.5, 5, 25, 120])
+    distance = haversine_km(lat, lon, located.latitude.to_numpy(), located.longitude.to_numpy())
+    near = index.within(lat, lon, km)
+    assert sorted(near.index) == sorted(located.index[distance <= km])
+    assert near.km.is_monotonic_increasing
+
+    box = np.sort(rng.uniform(south, north, 2)).tolist() + np.sort(rng.uniform(west, east, 2)).tolist()
+    s, n, w, e = box
+    inside = located[located.latitude.between(s, n) & located.longitude.between(w, e)]
+    assert sorted(index.in_box(s, w, n, e).index) == sorted(inside.index)
+
+
+def test_save_and_load_keep_every_route(tmp_path):
+  routes = make_routes(500, 35.5, -116.0, 36.5, -115.0)
+  path = str(tmp_path / 'routes.csv')
+  RouteIndex(routes).save(path)
+  loaded = RouteIndex.load(path)
+  assert sorted(loaded.routes.index) == sorted(routes.dropna(subset=['latitude']).index)
+  assert sorted(loaded.within(36.0, -115.5, 20).index) == sorted(RouteIndex(routes).within(36.0, -115.5, 20).index)
+
+
+def test_edge_of_a_big_circle_far_north():
+  # the widest point of a 500 km circle at 65N is north of 65N, further east than 500 km / cos(65)
+  lat, lon, km = 65.0, -145.0, 500
+  d = km / 6371.0088
+  edge_lat = np.degrees(np.arcsin(np.sin(np.radians(lat)) / np.cos(d)))
+  edge_lon = lon + 0.9999 * np.degrees(np.arcsin(np.sin(d) / np.cos(np.radians(lat))))
+  routes = pd.DataFrame({'route': ['Edge'], 'location': ['Area-Edge'], 'latitude': [edge_lat], 'longitude': [edge_lon]},
+                        index=pd.Index(['1'], name='id'))
+  assert haversine_km(lat, lon, edge_lat, edge_lon) <= km
+  assert index_ids(RouteIndex(routes, 0.01).within(lat, lon, km)) == ['1']
+
+
+def test_circle_over_the_pole_looks_at_every_longitude():
+  routes = make_routes(300, 85.0, -180.0, 90.0, 180.0)
+  located = routes.dropna(subset=['latitude'])
+  distance = haversine_km(88.0, 0.0, located.latitude.to_numpy(), located.longitude.to_numpy())
+  assert index_ids(RouteIndex(routes).within(88.0, 0.0, 400)) == sorted(located.index[distance <= 400])
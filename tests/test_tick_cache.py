@@ -0,0 +1,24 @@
+import pytest
+from climbing_project_api.assets import tick_cache as tick_cache_module
+from climbing_project_api.assets.tick_cache import TickCache
+
+URL = 'https://www.mountainproject.com/user/1234567/first-last/tick-export'
+
+
+def test_failed_download_is_forgotten(monkeypatch):
+  calls = []
+  def ticks(url):
+    calls.append(url)
+    if len(calls) == 1:
+      raise IOError('connection reset')
+    return 'ticks for ' + url
+  monkeypatch.setattr(tick_cache_module, 'Ticks', ticks)
+
+  cache = TickCache()
+  with pytest.raises(IOError):
+    cache.get(URL)
+  assert cache._loading == {}
+  assert cache.get(URL) == 'ticks for ' + URL # downloaded again, not the failure cached
+  assert cache.get(URL) == 'ticks for ' + URL
+  assert calls == [URL, URL]
+  assert cache._loading == {}
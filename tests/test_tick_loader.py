@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from climbing_project_api.assets.tick_loader import TICK_STYLES, read_ticks
+
+EXPORT = '''Date,Route,Rating,Notes,URL,Pitches,Location,Avg Stars,Your Stars,Style,Lead Style,Route Type,Your Rating,Length,Rating Code
+2020-01-01,Arete,5.10a,,,1,Area > Wall,3,-1,Lead,Redpoint,Sport,,80,0
+2020-01-02,Roof,V4,,,1,Area > Cave,3,-1,Send,,Boulder,,15,0
+2020-01-03,Crack,5.9,,,1,Area > Wall,3,-1,Lead,Greenpoint,Trad,,90,0
+2020-01-04,Slab,5.8,,,1,Area > Wall,3,-1,Lead,Onsight,Trad,,60,0
+2020-01-05,Mantle,V2,,,1,Area > Cave,3,-1,Repeat,,Boulder,,12,0
+'''
+
+
+@pytest.fixture
+def export(tmp_path):
+  path = tmp_path / 'ticks.csv'
+  path.write_text(EXPORT)
+  return str(path)
+
+
+def test_known_styles_use_the_fixed_categories(tmp_path):
+  path = tmp_path / 'ticks.csv'
+  path.write_text('\n'.join(line for line in EXPORT.splitlines() if 'Greenpoint' not in line and 'Repeat' not in line))
+  ticks = read_ticks(str(path))
+  assert ticks.Style.dtype == TICK_STYLES
+  assert ticks['Lead Style'].dtype == TICK_STYLES
+
+
+def test_unknown_styles_are_kept_with_a_warning(export):
+  with pytest.warns(UserWarning, match='Greenpoint, Repeat'):
+    ticks = read_ticks(export)
+  assert ticks.Style.tolist() == ['Lead', 'Send', 'Lead', 'Lead', 'Repeat']
+  assert ticks['Lead Style'].tolist()[2] == 'Greenpoint'
+  # one shared dtype, so a boulder's style can still fill its lead style
+  assert ticks.Style.dtype == ticks['Lead Style'].dtype
+  assert ticks['Lead Style'].fillna(ticks.Style).tolist() == ['Redpoint', 'Send', 'Greenpoint', 'Onsight', 'Repeat']
+
+
+def test_chunks_with_different_unknown_styles_join_back(export):
+  with pytest.warns(UserWarning):
+    whole = read_ticks(export)
+    chunked = read_ticks(export, chunksize=2)
+  pd.testing.assert_frame_equal(chunked, whole, check_categorical=False)
+  assert chunked.Style.dtype == chunked['Lead Style'].dtype
@@ -0,0 +1,75 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from climbing_project_api.assets.tick_loader import read_ticks, TICK_COLUMNS
+from climbing_project_api.assets.tick_store import TickStore
+
+URL = 'https://www.mountainproject.com/user/1234567/first-last/tick-export'
+
+
+def export(tmp_path, days, name):
+  """ a tick export csv with one tick per day in days, read back like a download """
+  i = np.arange(days) # ticks only depend on their day, so a later export starts with the earlier one
+  ticks = pd.DataFrame({
+    'Date': pd.date_range('2010-01-01', periods=days).strftime('%Y-%m-%d'),
+    'Route': ['Route ' + str(i) for i in range(days)],
+    'Rating': np.array(['5.9', '5.10a', '5.11b R', 'V3'])[i % 4],
+    'Style': 'Lead',
+    'Lead Style': np.array(['Redpoint', 'Onsight'])[i // 3 % 2],
+    'Route Type': np.array(['Sport', 'Trad'])[i // 5 % 2],
+    'Location': 'Nevada > Red Rock',
+    'Length': 80.0,
+    'Pitches': 1.0,
+    })
+  path = tmp_path / name
+  ticks.to_csv(path, index=False)
+  return read_ticks(str(path))
+
+
+def same_ticks(stored, ticks):
+  stored = stored[TICK_COLUMNS].reset_index(drop=True)
+  pd.testing.assert_frame_equal(stored, ticks[TICK_COLUMNS].reset_index(drop=True), check_categorical=False, check_dtype=False)
+
+
+def test_refresh_only_adds_new_ticks(tmp_path):
+  store = TickStore(str(tmp_path / 'store'))
+  first = export(tmp_path, 2000, 'first.csv')
+  assert store.refresh(URL, first) == 2000
+  assert store.refresh(URL, first) == 0
+  later = export(tmp_path, 3000, 'later.csv')
+  assert store.refresh(URL, later) == 1001 # the last stored day again, then 1000 new days
+  assert store.refresh(URL, later) == 0
+  same_ticks(store.load(URL), later)
+
+
+def test_compact_keeps_every_tick(tmp_path):
+  store = TickStore(str(tmp_path / 'store'))
+  for days in (100, 150, 220):
+    store.refresh(URL, export(tmp_path, days, f'{days}.csv'))
+  assert len(store._parts(URL)) == 3
+  store.compact(URL)
+  assert len(store._parts(URL)) == 1
+  same_ticks(store.load(URL), export(tmp_path, 220, 'all.csv'))
+  assert store.refresh(URL, export(tmp_path, 230, '230.csv')) == 11 # refresh carries on after compacting
+  same_ticks(store.load(URL), export(tmp_path, 230, 'all.csv'))
+
+
+def test_crash_while_compacting_loses_nothing(tmp_path, monkeypatch):
+  store = TickStore(str(tmp_path / 'store'))
+  for days in (100, 150, 220, 300):
+    store.refresh(URL, export(tmp_path, days, f'{days}.csv'))
+  removed = []
+
+  def crash_after_one(path):
+    if removed:
+      raise OSError('power cut')
+    removed.append(path)
+    os.unlink(path)
+
+  monkeypatch.setattr(os, 'remove', crash_after_one)
+  with pytest.raises(OSError):
+    store.compact(URL)
+  monkeypatch.undo()
+  assert len(store._parts(URL)) == 3 # merged part 0 and two old parts
+  same_ticks(store.load(URL), export(tmp_path, 300, 'all.csv'))